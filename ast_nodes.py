@@ -1,57 +1,174 @@
-import re 
-from enum import Enum 
-from typing import List, Optional, Set
+from typing import List, Optional, Tuple
+
+# Nodes are immutable: their fields are set once, past the __setattr__ guard
+_set = object.__setattr__
 
 class ASTNode:
-    pass
+    """
+    Base of the immutable AST.
+
+    Nodes use __slots__ and cannot be changed after construction. The
+    structural hash is computed once from the children's hashes, and nodes with
+    the same class and fields are equal, so a repeated subexpression can key a
+    dict (see NFABuilder.build_from_ast). Parsing does not intern nodes: equal
+    subtrees of a pattern are distinct objects. Only the derivative engine
+    interns the nodes it builds (see derivatives.py), and sets `uid` on them.
+    """
+    __slots__ = ('_hash', 'uid', '__weakref__')
+    _fields: Tuple[str, ...] = ()
+
+    def __init__(self, *args):
+        for field, value in zip(self._fields, args):
+            _set(self, field, value)
+        _set(self, '_hash', hash((type(self),) + args))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(other) is not type(self) or other._hash != self._hash:
+            return False
+        # Compare the two trees with a stack: chains can be deeper than the recursion limit
+        pairs = [(self, other)]
+        while pairs:
+            left, right = pairs.pop()
+            for field in left._fields:
+                mine = getattr(left, field)
+                theirs = getattr(right, field)
+                if mine is theirs:
+                    continue
+                if isinstance(mine, ASTNode):
+                    if type(theirs) is not type(mine) or theirs._hash != mine._hash:
+                        return False
+                    pairs.append((mine, theirs))
+                elif mine != theirs:
+                    return False
+        return True
+
+    def __reduce__(self):
+        return type(self), tuple(getattr(self, field) for field in self._fields)
+
+    def children(self) -> List["ASTNode"]:
+        return [value for value in (getattr(self, field) for field in self._fields)
+                if isinstance(value, ASTNode)]
 
 class CharNode(ASTNode):
+    __slots__ = ('char',)
+    _fields = ('char',)
+
     def __init__(self, char: str):
-        self.char = char
-    
+        _set(self, 'char', char)
+        _set(self, '_hash', hash((CharNode, char)))
+
     def __repr__(self):
         return f"Char('{self.char}')"
 
 class DigitNode(ASTNode):
+    __slots__ = ('digit',)
+    _fields = ('digit',)
+
     def __init__(self, digit: str):
-        self.digit = digit
-    
+        _set(self, 'digit', digit)
+        _set(self, '_hash', hash((DigitNode, digit)))
+
     def __repr__(self):
         return f"Digit('{self.digit}')"
 
 class StarNode(ASTNode):
+    __slots__ = ('expr',)
+    _fields = ('expr',)
+
     def __init__(self, expr: ASTNode):
-        self.expr = expr
-    
+        _set(self, 'expr', expr)
+        _set(self, '_hash', hash((StarNode, expr._hash)))
+
     def __repr__(self):
         return f"Star({self.expr})"
 
 class PlusNode(ASTNode):
+    __slots__ = ('expr',)
+    _fields = ('expr',)
+
     def __init__(self, expr: ASTNode):
-        self.expr = expr
-    
+        _set(self, 'expr', expr)
+        _set(self, '_hash', hash((PlusNode, expr._hash)))
+
     def __repr__(self):
         return f"Plus({self.expr})"
 
 class OptionalNode(ASTNode):
+    __slots__ = ('expr',)
+    _fields = ('expr',)
+
     def __init__(self, expr: ASTNode):
-        self.expr = expr
-    
+        _set(self, 'expr', expr)
+        _set(self, '_hash', hash((OptionalNode, expr._hash)))
+
     def __repr__(self):
         return f"Optional({self.expr})"
 
+class GroupNode(ASTNode):
+    __slots__ = ('expr', 'index')
+    _fields = ('expr', 'index')
+
+    def __init__(self, expr: ASTNode, index: int):
+        _set(self, 'expr', expr)
+        _set(self, 'index', index)
+        _set(self, '_hash', hash((GroupNode, expr._hash, index)))
+
+    def __repr__(self):
+        return f"Group{self.index}({self.expr})"
+
 class OrNode(ASTNode):
+    __slots__ = ('left', 'right')
+    _fields = ('left', 'right')
+
     def __init__(self, left: ASTNode, right: ASTNode):
-        self.left = left
-        self.right = right
-    
+        _set(self, 'left', left)
+        _set(self, 'right', right)
+        _set(self, '_hash', hash((OrNode, left._hash, right._hash)))
+
     def __repr__(self):
         return f"Or({self.left}, {self.right})"
 
 class ConcatNode(ASTNode):
+    __slots__ = ('left', 'right')
+    _fields = ('left', 'right')
+
     def __init__(self, left: ASTNode, right: ASTNode):
-        self.left = left
-        self.right = right
-    
+        _set(self, 'left', left)
+        _set(self, 'right', right)
+        _set(self, '_hash', hash((ConcatNode, left._hash, right._hash)))
+
     def __repr__(self):
-        return f"Concat({self.left}, {self.right})"
\ No newline at end of file
+        return f"Concat({self.left}, {self.right})"
+
+def flatten(node: ASTNode, cls: type) -> List[ASTNode]:
+    """Operands of a chain of binary `cls` nodes (OrNode / ConcatNode), left to right, without recursion."""
+    items: List[ASTNode] = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if type(node) is cls:
+            stack.append(node.right)
+            stack.append(node.left)
+        else:
+            items.append(node)
+    return items
+
+def literal_string(node: ASTNode) -> Optional[str]:
+    """The text matched by a concatenation of plain characters, None if node is anything else."""
+    chars = []
+    for item in flatten(node, ConcatNode):
+        if type(item) is CharNode:
+            chars.append(item.char)
+        elif type(item) is DigitNode:
+            chars.append(item.digit)
+        else:
+            return None
+    return ''.join(chars)
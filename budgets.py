@@ -0,0 +1,101 @@
+"""
+Resource budgets for compiling and matching untrusted patterns.
+
+A Budget caps each stage of the pipeline; None leaves a stage unlimited.
+Every cap has its own exception, all subclasses of BudgetExceeded, carrying
+the limit and the size that went over it (or the size reached when the
+stage was stopped early).
+"""
+from typing import Dict, NamedTuple, Optional
+
+from ast_nodes import ASTNode
+from nfa import NFA
+
+
+class Budget(NamedTuple):
+    max_pattern_length: Optional[int] = 1000
+    max_ast_nodes: Optional[int] = 2000
+    max_nfa_states: Optional[int] = 10000
+    max_dfa_states: Optional[int] = 10000
+    max_match_steps: Optional[int] = 10_000_000
+    # The parser recurses once per level of parentheses
+    max_nesting_depth: Optional[int] = 100
+
+
+# No limits at all, what compile_regex uses by default
+UNLIMITED = Budget(None, None, None, None, None, None)
+
+
+class BudgetExceeded(Exception):
+    """Base class: `what` went over `limit` (`actual` is what was counted)."""
+    what = "resource"
+
+    def __init__(self, limit: int, actual: int):
+        super().__init__(f"{self.what} budget exceeded: {actual} > {limit}")
+        self.limit = limit
+        self.actual = actual
+
+    def __reduce__(self):
+        # Default pickling would call cls(message), results cross process pools
+        return type(self), (self.limit, self.actual)
+
+class PatternTooLong(BudgetExceeded):
+    what = "Pattern length"
+
+class TooManyASTNodes(BudgetExceeded):
+    what = "AST node"
+
+class TooManyNFAStates(BudgetExceeded):
+    what = "NFA state"
+
+class TooManyDFAStates(BudgetExceeded):
+    what = "DFA state"
+
+class MatchStepsExceeded(BudgetExceeded):
+    what = "Match step"
+
+class NestingTooDeep(BudgetExceeded):
+    what = "Nesting depth"
+
+
+def check(limit: Optional[int], actual: int, error: type):
+    """Raise error(limit, actual) if actual is over a (non-None) limit"""
+    if limit is not None and actual > limit:
+        raise error(limit, actual)
+
+
+def nesting_depth(pattern: str) -> int:
+    """Deepest level of parentheses in the pattern, read before parsing it"""
+    depth = deepest = 0
+    for ch in pattern:
+        if ch == '(':
+            depth += 1
+            if depth > deepest:
+                deepest = depth
+        elif ch == ')':
+            depth -= 1
+    return deepest
+
+
+def count_ast_nodes(root: ASTNode) -> int:
+    """Size of the AST as a tree: shared subtrees count once per occurrence, like the NFA they build."""
+    sizes: Dict[ASTNode, int] = {}
+    stack = [root]
+    while stack:
+        node = stack[-1]
+        if node in sizes:
+            stack.pop()
+            continue
+        pending = [child for child in node.children() if child not in sizes]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        sizes[node] = 1 + sum(sizes[child] for child in node.children())
+    return sizes[root]
+
+
+def count_nfa_states(nfa: NFA) -> int:
+    """Number of states reachable from the start"""
+    states, _ = nfa.number_states()
+    return len(states)
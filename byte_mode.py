@@ -0,0 +1,163 @@
+"""
+Matching raw bytes (bytes, bytearray, memoryview, mmap) without decoding.
+
+utf8_lower() rewrites a character NFA into a byte NFA: every edge labelled
+with a character becomes a chain of edges labelled with the byte values
+(ints 0..255) of its UTF-8 encoding, and the chains leaving one state share
+their common lead bytes. Determinizing that NFA gives a ByteDFA, which walks
+the input one byte at a time through a memoryview, so nothing is copied or
+decoded. Input that is not valid UTF-8 simply fails to match.
+"""
+import mmap
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from nfa import NFA
+from state import State
+from dfa import DEAD, DFA
+from pattern_cache import PatternCache, compile_pattern
+from budgets import UNLIMITED, Budget, MatchStepsExceeded, TooManyNFAStates, check, count_nfa_states
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+_NEWLINE = ord('\n')
+_CARRIAGE_RETURN = ord('\r')
+
+
+def utf8_lower(nfa: NFA) -> NFA:
+    """Copy of nfa over UTF-8 bytes; ε edges and capture slots are kept (captures become byte offsets)."""
+    clones = {nfa.start: State(nfa.start.is_accept)}
+    stack = [nfa.start]
+
+    def clone_of(state: State) -> State:
+        if state not in clones:
+            clones[state] = State(state.is_accept)
+            stack.append(state)
+        return clones[state]
+
+    while stack:
+        state = stack.pop()
+        clone = clones[state]
+        clone.save = state.save
+        # (lead bytes read so far) -> intermediate state, shared by the chains of this state
+        prefixes: Dict[bytes, State] = {}
+        for char, dests in state.transitions.items():
+            encoded = char.encode('utf-8')
+            source = clone
+            for i in range(1, len(encoded)):
+                prefix = encoded[:i]
+                if prefix not in prefixes:
+                    prefixes[prefix] = State()
+                    source.add_transition(encoded[i - 1], prefixes[prefix])
+                source = prefixes[prefix]
+            for dest in dests:
+                source.add_transition(encoded[-1], clone_of(dest))
+        for dest in state.epsilon_transitions:
+            clone.add_epsilon_transition(clone_of(dest))
+
+    return NFA(clones[nfa.start], clones[nfa.accept])
+
+
+class ByteDFA(DFA):
+    """
+    DFA whose alphabet is byte values. byte_symbol[b] is the symbol id of byte b
+    (-1 if no transition uses it), so a step is two list lookups.
+    """
+
+    def __init__(self, alphabet: List[int], table: List[int], accepting: List[bool], start: int = 0):
+        super().__init__(alphabet, table, accepting, start)
+        self.byte_symbol = [-1] * 256
+        for symbol, byte in enumerate(alphabet):
+            self.byte_symbol[byte] = symbol
+
+    def simulate(self, data: Buffer) -> bool:
+        """Full match of a bytes-like object, read in place"""
+        table = self.table
+        byte_symbol = self.byte_symbol
+        num_symbols = self.num_symbols
+        state = self.start
+
+        with memoryview(data) as view, view.cast('B') as octets:
+            for byte in octets:
+                symbol = byte_symbol[byte]
+                if symbol < 0:
+                    return False
+                state = table[state * num_symbols + symbol]
+                if state == DEAD:
+                    return False
+
+        return self.accepting[state]
+
+    def match_lines(self, data: Buffer) -> Iterator[Tuple[int, int]]:
+        """
+        (start, end) byte offsets of every line matched in full, in one pass over
+        the buffer. end excludes the line terminator ('\\n' or '\\r\\n').
+        """
+        table = self.table
+        byte_symbol = self.byte_symbol
+        num_symbols = self.num_symbols
+        accepting = self.accepting
+        start = self.start
+
+        state = start
+        before_cr = DEAD  # state before a trailing '\r', if the last byte was one
+        line_start = 0
+        with memoryview(data) as view, view.cast('B') as octets:
+            for pos, byte in enumerate(octets):
+                if byte == _NEWLINE:
+                    if state != DEAD and accepting[state]:
+                        yield line_start, pos
+                    elif before_cr != DEAD and accepting[before_cr]:
+                        yield line_start, pos - 1
+                    state = start
+                    before_cr = DEAD
+                    line_start = pos + 1
+                    continue
+                before_cr = state if byte == _CARRIAGE_RETURN else DEAD
+                if state != DEAD:
+                    symbol = byte_symbol[byte]
+                    state = table[state * num_symbols + symbol] if symbol >= 0 else DEAD
+            end = len(octets)
+        if line_start < end:
+            if state != DEAD and accepting[state]:
+                yield line_start, end
+            elif before_cr != DEAD and accepting[before_cr]:
+                yield line_start, end - 1
+
+    def __repr__(self):
+        return f"ByteDFA(states={self.num_states}, bytes={len(self.alphabet)})"
+
+
+class BytePattern:
+    """A regex compiled down to UTF-8 bytes: the byte NFA and its ByteDFA."""
+
+    def __init__(self, pattern: str, nfa: NFA, dfa: ByteDFA, budget: Budget = UNLIMITED):
+        self.pattern = pattern
+        self.nfa = nfa
+        self.dfa = dfa
+        self.budget = budget
+
+    def match(self, data: Buffer) -> bool:
+        """True if the whole buffer is accepted; raises MatchStepsExceeded past the step budget"""
+        # The DFA takes exactly one step per byte
+        check(self.budget.max_match_steps, len(data), MatchStepsExceeded)
+        return self.dfa.simulate(data)
+
+    def match_lines(self, data: Buffer) -> Iterator[Tuple[int, int]]:
+        return self.dfa.match_lines(data)
+
+    def __repr__(self):
+        return f"BytePattern({self.pattern!r}, {self.dfa})"
+
+
+def compile_bytes(pattern: str, cache: Optional[PatternCache] = None) -> BytePattern:
+    """
+    Compile through the pattern cache, then lower the NFA to UTF-8 bytes and
+    determinize it. The cache's budget also caps the byte NFA and ByteDFA
+    (there is no NFA fallback here: over max_dfa_states raises TooManyDFAStates).
+    """
+    compiled = compile_pattern(pattern, cache)
+    budget = compiled.budget
+    nfa = utf8_lower(compiled.nfa)
+    if budget.max_nfa_states is not None:
+        check(budget.max_nfa_states, count_nfa_states(nfa), TooManyNFAStates)
+    return BytePattern(pattern, nfa, ByteDFA.from_nfa(nfa, budget.max_dfa_states), budget)
@@ -0,0 +1,196 @@
+"""
+Command line entry point: python cli.py {compile,match,grep,dot,bench} ...
+
+None of the modules imported here import graphviz or run anything on
+import: graphviz is only loaded by `dot --render`, in dot_export.
+"""
+import argparse
+import mmap
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from pattern_cache import compile_regex
+from budgets import count_nfa_states
+from byte_mode import compile_bytes
+from dot_export import DEFAULT_MAX_EDGES, DEFAULT_MAX_NODES, dfa_view, render_async, thompson_view, write_dot
+from enumeration import AcceptedStrings
+from nfa_sim import NFASimulator
+
+# Modules every user of the engine ends up importing
+CORE_MODULES = ('lexer', 'regex_parser', 'nfa_builder', 'dfa', 'pattern_cache', 'pike_vm', 'byte_mode')
+
+# Fail `bench` when importing the core takes longer than this
+DEFAULT_MAX_IMPORT_MS = 50.0
+
+
+def cmd_compile(args) -> int:
+    started = time.perf_counter()
+    compiled = compile_regex(args.pattern)
+    elapsed = time.perf_counter() - started
+    print(f"Pattern:    {args.pattern!r}")
+    print(f"NFA states: {count_nfa_states(compiled.nfa)}")
+    print(f"DFA states: {compiled.dfa.num_states}")
+    print(f"Alphabet:   {''.join(compiled.dfa.alphabet)!r}")
+    print(f"Groups:     {compiled.num_groups}")
+    print(f"Compiled in {elapsed * 1000:.2f} ms")
+    return 0
+
+
+def cmd_match(args) -> int:
+    compiled = compile_regex(args.pattern)
+    all_matched = True
+    for text in args.texts:
+        result = compiled.match(text)
+        all_matched = all_matched and result
+        print(f"  '{text}' -> {'✅ ACCEPT' if result else '❌ REJECT'}")
+    return 0 if all_matched else 1
+
+
+def _grep_file(compiled, path: str, line_numbers: bool, count_only: bool) -> int:
+    with open(path, 'rb') as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            spans, data = [], b''
+        else:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            spans = compiled.match_lines(data)
+        try:
+            found = 0
+            lineno, counted_to = 1, 0
+            for start, end in spans:
+                found += 1
+                if count_only:
+                    continue
+                if line_numbers:
+                    # Count the newlines between the previous match and this one
+                    pos = data.find(b'\n', counted_to, start)
+                    while pos >= 0:
+                        lineno += 1
+                        pos = data.find(b'\n', pos + 1, start)
+                    counted_to = start
+                prefix = f"{path}:{lineno}:" if line_numbers else f"{path}:"
+                print(prefix + data[start:end].decode('utf-8', errors='replace'))
+            if count_only:
+                print(f"{path}:{found}")
+            return found
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+def cmd_grep(args) -> int:
+    compiled = compile_bytes(args.pattern)
+    found = 0
+    for path in args.files:
+        found += _grep_file(compiled, path, args.line_numbers, args.count)
+    return 0 if found else 1
+
+
+def cmd_dot(args) -> int:
+    compiled = compile_regex(args.pattern)
+    view = dfa_view(compiled.dfa) if args.dfa else thompson_view(compiled.nfa)
+    stats = write_dot(view, args.output, args.max_nodes, args.max_edges)
+    print(f"DOT source written to {args.output} ({stats.nodes} states, {stats.edges} edges)")
+    if args.render:
+        print(f"Rendered {render_async(args.output, format=args.render).result()}")
+    return 0
+
+
+def measure_import_ms(modules=CORE_MODULES, runs: int = 5) -> float:
+    """Best wall time (ms) to import the modules in a fresh interpreter."""
+    code = ("import time; started = time.perf_counter(); "
+            f"import {', '.join(modules)}; "
+            "print((time.perf_counter() - started) * 1000)")
+    package_dir = str(Path(__file__).resolve().parent)
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=package_dir, check=True,
+                                capture_output=True, text=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def _best_of(runs: int, func, *args) -> float:
+    best = float('inf')
+    for _ in range(runs):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def cmd_bench(args) -> int:
+    import_ms = measure_import_ms(runs=args.runs)
+    print(f"Core import: {import_ms:.2f} ms (budget {args.max_import_ms:.0f} ms)")
+
+    for pattern in args.patterns:
+        compile_s = _best_of(args.runs, compile_regex, pattern)
+        compiled = compile_regex(pattern)
+        byte_pattern = compile_bytes(pattern)
+        language = AcceptedStrings(compiled.dfa)
+        length = args.length
+        while length > 0 and not language.count(length):
+            length -= 1
+        text = language.sample(length) if language.count(length) else ''
+        data = text.encode('utf-8')
+
+        dfa_s = _best_of(args.runs, compiled.match, text)
+        bytes_s = _best_of(args.runs, byte_pattern.match, data)
+        nfa_s = _best_of(args.runs, compiled.nfa.simulate, text)
+        sim_s = _best_of(args.runs, NFASimulator(compiled.nfa).simulate, text)
+        size = max(len(text), 1)
+        print(f"\n{pattern!r}: compile {compile_s * 1000:.2f} ms, "
+              f"{compiled.dfa.num_states} DFA states, input {len(text)} chars")
+        for name, seconds in (('DFA', dfa_s), ('bytes DFA', bytes_s), ('NFA', nfa_s), ('NFA (ids)', sim_s)):
+            print(f"  {name:<10} {seconds * 1000:8.2f} ms  {size / seconds / 1e6:8.2f} Mchar/s")
+
+    if import_ms > args.max_import_ms:
+        print(f"\nCore import took {import_ms:.2f} ms, over the {args.max_import_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Regex compiler and matcher (Thompson NFA / DFA)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    compile_cmd = sub.add_parser('compile', help="Compile a pattern and print automaton statistics")
+    compile_cmd.add_argument('pattern')
+    compile_cmd.set_defaults(func=cmd_compile)
+
+    match = sub.add_parser('match', help="Full-match texts against a pattern")
+    match.add_argument('pattern')
+    match.add_argument('texts', nargs='+')
+    match.set_defaults(func=cmd_match)
+
+    grep = sub.add_parser('grep', help="Print the lines of files matched in full (bytes mode, mmap)")
+    grep.add_argument('pattern')
+    grep.add_argument('files', nargs='+')
+    grep.add_argument('-n', '--line-numbers', action='store_true')
+    grep.add_argument('-c', '--count', action='store_true', help="Only print the number of matching lines")
+    grep.set_defaults(func=cmd_grep)
+
+    dot = sub.add_parser('dot', help="Write the NFA (or DFA) of a pattern as Graphviz DOT")
+    dot.add_argument('pattern')
+    dot.add_argument('-o', '--output', default='pattern.gv')
+    dot.add_argument('--dfa', action='store_true', help="Export the DFA instead of the Thompson NFA")
+    dot.add_argument('--render', metavar='FORMAT', help="Also render with graphviz (png, pdf, svg...)")
+    dot.add_argument('--max-nodes', type=int, default=DEFAULT_MAX_NODES)
+    dot.add_argument('--max-edges', type=int, default=DEFAULT_MAX_EDGES)
+    dot.set_defaults(func=cmd_dot)
+
+    bench = sub.add_parser('bench', help="Measure core import time, compile time and match throughput")
+    bench.add_argument('patterns', nargs='*', default=['(a|b)*abb', 'a+1?(c|d)*', '(0|1(01*0)*1)*'])
+    bench.add_argument('--length', type=int, default=10000, help="Length of the sampled input")
+    bench.add_argument('--runs', type=int, default=5)
+    bench.add_argument('--max-import-ms', type=float, default=DEFAULT_MAX_IMPORT_MS)
+    bench.set_defaults(func=cmd_bench)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,403 @@
+"""
+Matching by Brzozowski derivatives of the AST, as an alternative to Thompson
+construction + subset construction.
+
+The derivative of a regex r by a character c matches the suffixes w such that
+cw is matched by r. Each distinct (normalized) derivative is one DFA state, so
+a DFA is built lazily, one transition per (state, character) actually read.
+The smart constructors below keep derivatives in a normal form (alternatives
+flattened, sorted and deduplicated, ∅ and ε simplified away), which keeps the
+number of distinct derivatives finite and the DFA small without minimization.
+Intersection (&) and complement (~) come for free.
+
+Every node the engine builds is interned (see _make), so equal derivatives
+are one object: equality is identity and the memo tables stay small.
+"""
+import itertools
+import threading
+import weakref
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from ast_nodes import (ASTNode, CharNode, DigitNode, StarNode, PlusNode, OptionalNode, GroupNode,
+                       OrNode, ConcatNode, flatten)
+from lexer import Lexer
+from regex_parser import Parser
+from dfa import DEAD, DFA
+
+
+# --- Nodes only this engine understands ---
+
+class EmptyNode(ASTNode):
+    """∅ : matches nothing"""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "Empty"
+
+class EpsilonNode(ASTNode):
+    """ε : matches only the empty string"""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "Epsilon"
+
+class AndNode(ASTNode):
+    """r & s : strings matched by both"""
+    __slots__ = ('left', 'right')
+    _fields = ('left', 'right')
+
+    def __init__(self, left: ASTNode, right: ASTNode):
+        super().__init__(left, right)
+
+    def __repr__(self):
+        return f"And({self.left}, {self.right})"
+
+class NotNode(ASTNode):
+    """~r : every string r does not match"""
+    __slots__ = ('expr',)
+    _fields = ('expr',)
+
+    def __init__(self, expr: ASTNode):
+        super().__init__(expr)
+
+    def __repr__(self):
+        return f"Not({self.expr})"
+
+
+# --- Interning ---
+
+_interned: "weakref.WeakValueDictionary" = weakref.WeakValueDictionary()
+# Shared by every thread using the engine
+_interned_lock = threading.Lock()
+_uids = itertools.count()
+
+def _make(cls: type, *args) -> ASTNode:
+    """
+    The node cls(*args), interned: the live node with the same class and fields
+    if there is one. `uid` numbers interned nodes in creation order and gives
+    them a stable total order.
+    """
+    key = (cls,) + args
+    with _interned_lock:
+        node = _interned.get(key)
+        if node is None:
+            node = cls(*args)
+            object.__setattr__(node, 'uid', next(_uids))
+            _interned[key] = node
+    return node
+
+EMPTY = _make(EmptyNode)
+EPSILON = _make(EpsilonNode)
+ANYTHING = _make(NotNode, EMPTY)
+
+
+# --- Smart constructors (normal form) ---
+
+def _chain(cls: type, items: List[ASTNode]) -> ASTNode:
+    """Right-nested chain of binary nodes."""
+    node = items[-1]
+    for item in reversed(items[:-1]):
+        node = _make(cls, item, node)
+    return node
+
+def mk_or(*operands: ASTNode) -> ASTNode:
+    items: Set[ASTNode] = set()
+    for operand in operands:
+        items.update(flatten(operand, OrNode))
+    items.discard(EMPTY)
+    if ANYTHING in items:
+        return ANYTHING
+    if not items:
+        return EMPTY
+    return _chain(OrNode, sorted(items, key=lambda node: node.uid))
+
+def mk_and(*operands: ASTNode) -> ASTNode:
+    items: Set[ASTNode] = set()
+    for operand in operands:
+        items.update(flatten(operand, AndNode))
+    if EMPTY in items:
+        return EMPTY
+    items.discard(ANYTHING)
+    if not items:
+        return ANYTHING
+    return _chain(AndNode, sorted(items, key=lambda node: node.uid))
+
+def mk_concat(*operands: ASTNode) -> ASTNode:
+    items: List[ASTNode] = []
+    for operand in operands:
+        for item in flatten(operand, ConcatNode):
+            if item is EMPTY:
+                return EMPTY
+            if item is not EPSILON:
+                items.append(item)
+    if not items:
+        return EPSILON
+    return _chain(ConcatNode, items)
+
+def _prepend(head: ASTNode, tail: ASTNode) -> ASTNode:
+    """
+    mk_concat(head, tail) for a normalized tail that is not EMPTY: only the
+    items of head are chained onto tail, tail itself is reused as is.
+    """
+    if head is EMPTY:
+        return EMPTY
+    if head is EPSILON:
+        return tail
+    if tail is EPSILON:
+        return head
+    node = tail
+    for item in reversed(flatten(head, ConcatNode)):
+        node = _make(ConcatNode, item, node)
+    return node
+
+def mk_star(expr: ASTNode) -> ASTNode:
+    if type(expr) is StarNode:
+        return expr
+    if expr is EMPTY or expr is EPSILON:
+        return EPSILON
+    return _make(StarNode, expr)
+
+def mk_not(expr: ASTNode) -> ASTNode:
+    if type(expr) is NotNode:
+        return expr.expr
+    return _make(NotNode, expr)
+
+
+def normalize(node: ASTNode, memo: Optional[Dict[ASTNode, ASTNode]] = None) -> ASTNode:
+    """
+    Rewrite a Parser AST with the smart constructors: digits become characters,
+    a+ becomes aa*, a? becomes a|ε and groups are dropped (no captures here).
+    """
+    if memo is None:
+        memo = {}
+    result = memo.get(node)
+    if result is not None:
+        return result
+
+    if type(node) is DigitNode:
+        result = _make(CharNode, node.digit)
+    elif type(node) is StarNode:
+        result = mk_star(normalize(node.expr, memo))
+    elif type(node) is PlusNode:
+        expr = normalize(node.expr, memo)
+        result = mk_concat(expr, mk_star(expr))
+    elif type(node) is OptionalNode:
+        result = mk_or(normalize(node.expr, memo), EPSILON)
+    elif type(node) is GroupNode:
+        result = normalize(node.expr, memo)
+    elif type(node) is OrNode:
+        result = mk_or(*(normalize(item, memo) for item in flatten(node, OrNode)))
+    elif type(node) is ConcatNode:
+        result = mk_concat(*(normalize(item, memo) for item in flatten(node, ConcatNode)))
+    elif type(node) is AndNode:
+        result = mk_and(*(normalize(item, memo) for item in flatten(node, AndNode)))
+    elif type(node) is NotNode:
+        result = mk_not(normalize(node.expr, memo))
+    elif type(node) is CharNode:
+        result = _make(CharNode, node.char)
+    else:
+        result = _make(type(node))  # EmptyNode, EpsilonNode
+    memo[node] = result
+    return result
+
+
+class Derivatives:
+    """nullable() and derivative() with their results memoized per node."""
+
+    def __init__(self):
+        self._nullable: Dict[ASTNode, bool] = {EMPTY: False, EPSILON: True}
+        self._derivatives: Dict[Tuple[ASTNode, str], ASTNode] = {}
+
+    def nullable(self, node: ASTNode) -> bool:
+        """True if node matches the empty string"""
+        result = self._nullable.get(node)
+        if result is not None:
+            return result
+
+        kind = type(node)
+        if kind is CharNode:
+            result = False
+        elif kind is StarNode:
+            result = True
+        elif kind is OrNode:
+            result = any(self.nullable(item) for item in flatten(node, OrNode))
+        elif kind is AndNode:
+            result = all(self.nullable(item) for item in flatten(node, AndNode))
+        elif kind is ConcatNode:
+            # Walk the right-nested chain only down to a suffix already known:
+            # the derivatives of a chain are its suffixes, so this stays linear
+            spine = []
+            suffix = node
+            while type(suffix) is ConcatNode and suffix not in self._nullable:
+                spine.append(suffix)
+                suffix = suffix.right
+            result = self.nullable(suffix)
+            for link in reversed(spine):
+                result = result and self.nullable(link.left)
+                self._nullable[link] = result
+        elif kind is NotNode:
+            result = not self.nullable(node.expr)
+        else:
+            raise TypeError(f"Unsupported node in normalized regex: {node!r}")
+        self._nullable[node] = result
+        return result
+
+    def derivative(self, node: ASTNode, ch: str) -> ASTNode:
+        key = (node, ch)
+        result = self._derivatives.get(key)
+        if result is not None:
+            return result
+
+        kind = type(node)
+        if node is EMPTY or node is EPSILON:
+            result = EMPTY
+        elif kind is CharNode:
+            result = EPSILON if node.char == ch else EMPTY
+        elif kind is OrNode:
+            result = mk_or(*(self.derivative(item, ch) for item in flatten(node, OrNode)))
+        elif kind is AndNode:
+            result = mk_and(*(self.derivative(item, ch) for item in flatten(node, AndNode)))
+        elif kind is NotNode:
+            result = mk_not(self.derivative(node.expr, ch))
+        elif kind is StarNode:
+            result = _prepend(self.derivative(node.expr, ch), node)
+        elif kind is ConcatNode:
+            # d(rs) = d(r)s | d(s) if r is nullable; the chain is right-nested,
+            # so s is node.right and is reused instead of being rebuilt
+            result = _prepend(self.derivative(node.left, ch), node.right)
+            if self.nullable(node.left):
+                result = mk_or(result, self.derivative(node.right, ch))
+        else:
+            raise TypeError(f"Unsupported node in normalized regex: {node!r}")
+        self._derivatives[key] = result
+        return result
+
+
+class DerivativeDFA:
+    """
+    DFA whose states are normalized regexes, built lazily while matching:
+    transitions[state][ch] is filled the first time ch is read in that state.
+    """
+
+    def __init__(self, regex: ASTNode):
+        self.derivatives = Derivatives()
+        start = normalize(regex)
+        self.states: List[ASTNode] = [start]
+        self.ids: Dict[ASTNode, int] = {start: 0}
+        self.accepting: List[bool] = [self.derivatives.nullable(start)]
+        self.transitions: List[Dict[str, int]] = [{}]
+        self.start = 0
+
+    @classmethod
+    def from_pattern(cls, pattern: str) -> "DerivativeDFA":
+        return cls(Parser(Lexer(pattern)).parse())
+
+    @property
+    def num_states(self) -> int:
+        return len(self.states)
+
+    def is_dead(self, state: int) -> bool:
+        return self.states[state] is EMPTY
+
+    def step(self, state: int, ch: str) -> int:
+        nxt = self.transitions[state].get(ch)
+        if nxt is None:
+            node = self.derivatives.derivative(self.states[state], ch)
+            nxt = self.ids.get(node)
+            if nxt is None:
+                nxt = self.ids[node] = len(self.states)
+                self.states.append(node)
+                self.accepting.append(self.derivatives.nullable(node))
+                self.transitions.append({})
+            self.transitions[state][ch] = nxt
+        return nxt
+
+    def simulate(self, input_string: str) -> bool:
+        """Full match, extending the DFA with any transition not seen yet"""
+        state = self.start
+        transitions = self.transitions
+        for ch in input_string:
+            nxt = transitions[state].get(ch)
+            state = nxt if nxt is not None else self.step(state, ch)
+            if self.states[state] is EMPTY:
+                return False
+        return self.accepting[state]
+
+    def to_dfa(self, alphabet: Optional[Iterable[str]] = None) -> DFA:
+        """
+        Explore every state over `alphabet` (default: the characters of the regex)
+        and return the table-driven DFA. Characters outside the alphabet are
+        rejected by the result, which matters for complements.
+        """
+        if alphabet is None:
+            alphabet = _characters(self.states[self.start])
+        alphabet = sorted(set(alphabet))
+
+        # Explore from the start, numbering reachable non-dead states for the table
+        order = [self.start]
+        numbering = {self.start: 0}
+        i = 0
+        while i < len(order):
+            for ch in alphabet:
+                nxt = self.step(order[i], ch)
+                if not self.is_dead(nxt) and nxt not in numbering:
+                    numbering[nxt] = len(order)
+                    order.append(nxt)
+            i += 1
+
+        table = []
+        for state in order:
+            for ch in alphabet:
+                nxt = self.transitions[state][ch]
+                table.append(numbering.get(nxt, DEAD))
+        return DFA(alphabet, table, [self.accepting[state] for state in order])
+
+
+def _characters(node: ASTNode) -> Set[str]:
+    chars: Set[str] = set()
+    seen = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        if type(node) is CharNode:
+            chars.add(node.char)
+        stack.extend(node.children())
+    return chars
+
+
+RegexLike = Union[str, ASTNode]
+
+def _as_ast(regex: RegexLike) -> ASTNode:
+    return Parser(Lexer(regex)).parse() if isinstance(regex, str) else regex
+
+def intersect(left: RegexLike, right: RegexLike) -> DerivativeDFA:
+    """Lazy DFA for strings matched by both regexes"""
+    return DerivativeDFA(AndNode(_as_ast(left), _as_ast(right)))
+
+def complement(regex: RegexLike) -> DerivativeDFA:
+    """Lazy DFA for every string the regex does not match"""
+    return DerivativeDFA(NotNode(_as_ast(regex)))
+
+def difference(left: RegexLike, right: RegexLike) -> DerivativeDFA:
+    """Lazy DFA for strings matched by left but not by right"""
+    return DerivativeDFA(AndNode(_as_ast(left), NotNode(_as_ast(right))))
+
+
+def test_threaded_interning():
+    """DFAs built on several threads at once share the intern table and still agree state for state."""
+    print("\nTesting derivative DFAs built on several threads...")
+    from concurrent.futures import ThreadPoolExecutor
+    patterns = ['(a|b)*abb', '(ab|cd)*e?', '((a|b)(c|d)*e?)x((a|b)(c|d)*e?)', 'a(b|c)*(b|c)d']
+
+    def explore(pattern: str) -> Tuple[int, List[bool]]:
+        dfa = DerivativeDFA.from_pattern(pattern).to_dfa()
+        return dfa.num_states, dfa.accepting
+
+    expected = [explore(pattern) for pattern in patterns]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(5):
+            assert list(pool.map(explore, patterns * 4)) == expected * 4
+    print(f"  {len(patterns) * 20} DFAs built on 8 threads")
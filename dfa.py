@@ -0,0 +1,117 @@
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from budgets import TooManyDFAStates
+
+from nfa import NFA
+from state import State
+
+# Table entry for "no transition": the input is rejected as soon as it is reached
+DEAD = -1
+
+
+class DFA:
+    """
+    Deterministic automaton over integer states 0..N-1 and symbol ids 0..K-1.
+
+    The transition table is flat: table[state * num_symbols + symbol] is the next
+    state, or DEAD. Characters outside the alphabet always lead to DEAD.
+    """
+
+    def __init__(self, alphabet: List[str], table: List[int], accepting: List[bool], start: int = 0):
+        self.alphabet = alphabet
+        self.symbol_index: Dict[str, int] = {ch: i for i, ch in enumerate(alphabet)}
+        self.num_symbols = len(alphabet)
+        self.table = table
+        self.accepting = accepting
+        self.start = start
+
+    @property
+    def num_states(self) -> int:
+        return len(self.accepting)
+
+    @classmethod
+    def from_nfa(cls, nfa: NFA, max_states: Optional[int] = None) -> "DFA":
+        """
+        Subset construction over the State graph of a Thompson NFA (alphabet sorted).
+        Raises TooManyDFAStates as soon as more than max_states states are created.
+        """
+        alphabet, table, subsets = determinize(nfa, max_states)
+        return cls(alphabet, table, [any(state.is_accept for state in subset) for subset in subsets])
+
+    def step(self, state: int, ch: str) -> int:
+        """Next state after reading one character (DEAD stays DEAD)."""
+        if state == DEAD:
+            return DEAD
+        symbol = self.symbol_index.get(ch)
+        if symbol is None:
+            return DEAD
+        return self.table[state * self.num_symbols + symbol]
+
+    def is_accept(self, state: int) -> bool:
+        return state != DEAD and bool(self.accepting[state])
+
+    def is_dead(self, state: int) -> bool:
+        return state == DEAD
+
+    def simulate(self, input_string: str) -> bool:
+        """Run the DFA over the whole string (full match)"""
+        table = self.table
+        symbol_index = self.symbol_index
+        num_symbols = self.num_symbols
+        state = self.start
+
+        for ch in input_string:
+            symbol = symbol_index.get(ch)
+            if symbol is None:
+                return False
+            state = table[state * num_symbols + symbol]
+            if state == DEAD:
+                return False
+
+        return self.accepting[state]
+
+    def __repr__(self):
+        return f"DFA(states={self.num_states}, alphabet={''.join(self.alphabet)!r})"
+
+
+def determinize(nfa: NFA, max_states: Optional[int] = None) -> Tuple[List[str], List[int], List[FrozenSet[State]]]:
+    """
+    Subset construction: the sorted alphabet, the flat transition table and the
+    NFA states making up each DFA state (state i is subsets[i], 0 is the start).
+    Callers decide what accepting means for a subset. Raises TooManyDFAStates
+    when more than max_states subsets are reached (None: no limit).
+    """
+    states, _ = nfa.number_states()
+    alphabet = sorted({ch for state in states for ch in state.transitions})
+    symbol_index = {ch: i for i, ch in enumerate(alphabet)}
+    num_symbols = len(alphabet)
+
+    start_set = frozenset(nfa.get_epsilon_closure({nfa.start}))
+    ids: Dict[FrozenSet[State], int] = {start_set: 0}
+    subsets = [start_set]
+    table: List[int] = []
+
+    i = 0
+    while i < len(subsets):
+        current = subsets[i]
+
+        # Group the moves of every NFA state in the subset by character
+        moves: Dict[str, Set[State]] = {}
+        for state in current:
+            for ch, dests in state.transitions.items():
+                moves.setdefault(ch, set()).update(dests)
+
+        row = [DEAD] * num_symbols
+        for ch, dests in moves.items():
+            target = frozenset(nfa.get_epsilon_closure(dests))
+            target_id = ids.get(target)
+            if target_id is None:
+                target_id = ids[target] = len(subsets)
+                subsets.append(target)
+                if max_states is not None and len(subsets) > max_states:
+                    raise TooManyDFAStates(max_states, len(subsets))
+            row[symbol_index[ch]] = target_id
+        table.extend(row)
+        i += 1
+
+    return alphabet, table, subsets
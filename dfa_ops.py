@@ -0,0 +1,207 @@
+"""
+Language-level operations on compiled DFAs: intersection, union, difference,
+complement, emptiness, equivalence and inclusion.
+
+Operations return lazy views instead of new tables: a product state is just a
+pair of component states, computed by step() only when a search reaches it.
+Emptiness, equivalence and inclusion are breadth-first searches over these
+views, so they stop at the first accepted string (which is also the shortest
+counterexample) and never build the full product unless it has to be explored.
+materialize() turns any view into a table-driven DFA when one is needed.
+
+A view has the same interface as DFA: alphabet, start, step(state, ch),
+is_accept(state) and is_dead(state) (True only if no string can be accepted
+from that state any more; a view may return False when it does not know).
+"""
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, Union
+
+from dfa import DEAD, DFA
+from pattern_cache import CompiledPattern, compile_pattern
+
+Automaton = Union[str, CompiledPattern, DFA, "ProductDFA", "ComplementDFA"]
+
+_OPERATORS = {
+    'and': lambda left, right: left and right,
+    'or': lambda left, right: left or right,
+    'diff': lambda left, right: left and not right,
+    'xor': lambda left, right: left != right,
+}
+
+
+def _as_view(automaton: Automaton):
+    if isinstance(automaton, str):
+        automaton = compile_pattern(automaton)
+    if isinstance(automaton, CompiledPattern):
+        return automaton.require_dfa()
+    return automaton
+
+
+class ProductDFA:
+    """Lazy product of two automata over the union of their alphabets."""
+
+    def __init__(self, left: Automaton, right: Automaton, op: str):
+        self.left = _as_view(left)
+        self.right = _as_view(right)
+        self.op = op
+        self._accept = _OPERATORS[op]
+        self.alphabet = sorted(set(self.left.alphabet) | set(self.right.alphabet))
+        self.start = (self.left.start, self.right.start)
+
+    def step(self, state: Tuple[Hashable, Hashable], ch: str) -> Tuple[Hashable, Hashable]:
+        return self.left.step(state[0], ch), self.right.step(state[1], ch)
+
+    def is_accept(self, state: Tuple[Hashable, Hashable]) -> bool:
+        return self._accept(self.left.is_accept(state[0]), self.right.is_accept(state[1]))
+
+    def is_dead(self, state: Tuple[Hashable, Hashable]) -> bool:
+        left_dead = self.left.is_dead(state[0])
+        right_dead = self.right.is_dead(state[1])
+        if self.op == 'and':
+            return left_dead or right_dead
+        if self.op == 'diff':
+            return left_dead
+        return left_dead and right_dead
+
+
+class ComplementDFA:
+    """
+    Lazy complement relative to a finite alphabet (default: the automaton's own).
+    Strings using any other character are outside the universe and rejected.
+    """
+
+    def __init__(self, automaton: Automaton, alphabet: Optional[Iterable[str]] = None):
+        self.inner = _as_view(automaton)
+        self.alphabet = sorted(set(self.inner.alphabet if alphabet is None else alphabet))
+        self._allowed = set(self.alphabet)
+        self.start = self.inner.start
+
+    def step(self, state: Hashable, ch: str) -> Hashable:
+        if ch not in self._allowed:
+            return _OUTSIDE
+        return self.inner.step(state, ch)
+
+    def is_accept(self, state: Hashable) -> bool:
+        return state is not _OUTSIDE and not self.inner.is_accept(state)
+
+    def is_dead(self, state: Hashable) -> bool:
+        return state is _OUTSIDE
+
+
+class _Outside:
+    """State of a ComplementDFA after a character outside its alphabet."""
+
+    def __repr__(self):
+        return "OUTSIDE"
+
+_OUTSIDE = _Outside()
+
+
+def intersection(left: Automaton, right: Automaton) -> ProductDFA:
+    return ProductDFA(left, right, 'and')
+
+def union(left: Automaton, right: Automaton) -> ProductDFA:
+    return ProductDFA(left, right, 'or')
+
+def difference(left: Automaton, right: Automaton) -> ProductDFA:
+    """Strings accepted by left and rejected by right"""
+    return ProductDFA(left, right, 'diff')
+
+def symmetric_difference(left: Automaton, right: Automaton) -> ProductDFA:
+    return ProductDFA(left, right, 'xor')
+
+def complement(automaton: Automaton, alphabet: Optional[Iterable[str]] = None) -> ComplementDFA:
+    return ComplementDFA(automaton, alphabet)
+
+
+def shortest_accepted(automaton: Automaton) -> Optional[str]:
+    """
+    Shortest accepted string (the first in length-lexicographic order), found by a
+    breadth-first search that stops as soon as an accepting state is reached.
+    None if the language is empty.
+    """
+    view = _as_view(automaton)
+    start = view.start
+    if view.is_accept(start):
+        return ''
+    if view.is_dead(start):
+        return None
+
+    # state -> (previous state, character read), to rebuild the witness
+    parents: Dict[Hashable, Tuple[Hashable, str]] = {start: (None, '')}
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        for ch in view.alphabet:
+            nxt = view.step(state, ch)
+            if nxt in parents or view.is_dead(nxt):
+                continue
+            parents[nxt] = (state, ch)
+            if view.is_accept(nxt):
+                chars = []
+                while nxt != start:
+                    nxt, ch = parents[nxt]
+                    chars.append(ch)
+                return ''.join(reversed(chars))
+            queue.append(nxt)
+    return None
+
+
+def is_empty(automaton: Automaton) -> bool:
+    """True if no string is accepted"""
+    return shortest_accepted(automaton) is None
+
+
+def equivalent(left: Automaton, right: Automaton) -> Tuple[bool, Optional[str]]:
+    """(True, None) if both accept the same strings, else (False, shortest string accepted by only one)"""
+    witness = shortest_accepted(symmetric_difference(left, right))
+    return witness is None, witness
+
+
+def is_subset(left: Automaton, right: Automaton) -> Tuple[bool, Optional[str]]:
+    """(True, None) if every string accepted by left is accepted by right, else (False, shortest counterexample)"""
+    witness = shortest_accepted(difference(left, right))
+    return witness is None, witness
+
+
+def materialize(automaton: Automaton) -> DFA:
+    """Explore a view completely and return it as a table-driven DFA (dead states dropped)."""
+    view = _as_view(automaton)
+    alphabet = list(view.alphabet)
+    numbering: Dict[Hashable, int] = {view.start: 0}
+    order = [view.start]
+    table: List[int] = []
+    i = 0
+    while i < len(order):
+        state = order[i]
+        for ch in alphabet:
+            nxt = view.step(state, ch)
+            if view.is_dead(nxt):
+                table.append(DEAD)
+                continue
+            target = numbering.get(nxt)
+            if target is None:
+                target = numbering[nxt] = len(order)
+                order.append(nxt)
+            table.append(target)
+        i += 1
+    return DFA(alphabet, table, [view.is_accept(state) for state in order])
+
+
+def shadowed_rules(patterns: Sequence[Automaton]) -> List[Tuple[int, int, bool]]:
+    """
+    Rule-set audit for first-match-wins lists: (later, earlier, duplicate) for every
+    rule whose language is contained in an earlier rule's language, so it can never
+    fire. duplicate is True when the two rules accept exactly the same strings.
+    This compares every pair, so it does n^2 / 2 inclusion checks.
+    """
+    views = [_as_view(pattern) for pattern in patterns]
+    findings = []
+    for later in range(len(views)):
+        for earlier in range(later):
+            contained, _ = is_subset(views[later], views[earlier])
+            if contained:
+                duplicate, _ = is_subset(views[earlier], views[later])
+                findings.append((later, earlier, duplicate))
+                break
+    return findings
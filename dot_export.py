@@ -0,0 +1,263 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+from nfa import NFA
+
+# An edge label of None means an epsilon transition
+Successors = Callable[[Hashable], Iterable[Tuple[Optional[str], Hashable]]]
+
+DEFAULT_MAX_NODES = 500
+DEFAULT_MAX_EDGES = 2000
+
+
+class GraphView:
+    """
+    Minimal read-only view of an automaton for the exporter: a start node, a
+    function returning (label, target) pairs for a node and an accept predicate.
+    The graph is only ever walked from the start, so nothing is materialized.
+    """
+
+    def __init__(self, start: Hashable, successors: Successors,
+                 is_accept: Callable[[Hashable], bool], title: str = 'Automaton'):
+        self.start = start
+        self.successors = successors
+        self.is_accept = is_accept
+        self.title = title
+
+
+class ExportStats(NamedTuple):
+    nodes: int
+    edges: int
+    elided_nodes: int
+    elided_edges: int
+    collapsed_nodes: int
+
+    @property
+    def truncated(self) -> bool:
+        return self.elided_nodes > 0 or self.elided_edges > 0
+
+
+def thompson_view(nfa: NFA, title: str = 'NFA Thompson Construction') -> GraphView:
+    """View over the State graph built by NFABuilder."""
+    def successors(state):
+        for ch, dests in state.transitions.items():
+            for d in dests:
+                yield ch, d
+        for d in state.epsilon_transitions:
+            yield None, d
+
+    return GraphView(nfa.start, successors, lambda state: state.is_accept, title)
+
+
+def sparse_view(nfa, title: str = 'NFA') -> GraphView:
+    """View over an nfa_loader.SparseNFA, nodes are the integer state ids."""
+    def successors(state_id):
+        targets = nfa.epsilon_transitions[state_id]
+        if targets:
+            for d in targets:
+                yield None, d
+        table = nfa.transitions[state_id]
+        if table:
+            for symbol_id, targets in table.items():
+                for d in targets:
+                    yield nfa.symbols[symbol_id], d
+
+    return GraphView(nfa.start, successors, lambda state_id: state_id in nfa.finals, title)
+
+
+def dfa_view(dfa, title: str = 'DFA') -> GraphView:
+    """View over a table-driven dfa.DFA, nodes are the integer state ids (DEAD is not drawn)."""
+    def successors(state):
+        row = dfa.table[state * dfa.num_symbols:(state + 1) * dfa.num_symbols]
+        for ch, target in zip(dfa.alphabet, row):
+            if target >= 0:
+                yield str(ch), target
+
+    return GraphView(dfa.start, successors, lambda state: bool(dfa.accepting[state]), title)
+
+
+def format_labels(labels: List[Optional[str]]) -> str:
+    """
+    Merge the labels of parallel edges into one: runs of 3+ consecutive
+    single characters become ranges (a, b, c, d -> a-d), epsilon is shown as ε.
+    """
+    chars = sorted({label for label in labels if label is not None and len(label) == 1})
+    others = sorted({label for label in labels if label is not None and len(label) != 1})
+
+    parts = []
+    i = 0
+    while i < len(chars):
+        j = i
+        while j + 1 < len(chars) and ord(chars[j + 1]) == ord(chars[j]) + 1:
+            j += 1
+        if j - i >= 2:
+            parts.append(f"{chars[i]}-{chars[j]}")
+        else:
+            parts.extend(chars[i:j + 1])
+        i = j + 1
+    parts.extend(others)
+    if None in labels:
+        parts.append('ε')
+    return ','.join(parts)
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def write_dot(view: GraphView, path, max_nodes: int = DEFAULT_MAX_NODES,
+              max_edges: int = DEFAULT_MAX_EDGES, collapse_epsilon: bool = True) -> ExportStats:
+    """
+    Stream the automaton as DOT source straight to `path`, states labeled q0..qN
+    in BFS order from the start state.
+
+    - collapse_epsilon: a non-start, non-accept state whose only way out is a
+      single ε edge is skipped, edges into it go to its ε target instead.
+    - parallel edges between two states are merged into one labeled edge.
+    - at most max_nodes states and max_edges edges are written, edges to states
+      beyond the cap point to a single summary node.
+    """
+    is_accept = view.is_accept
+    successors = view.successors
+    start = view.start
+
+    # node -> node it collapses into (itself if it is kept)
+    resolved: Dict[Hashable, Hashable] = {}
+
+    def resolve(node):
+        if not collapse_epsilon:
+            return node
+        chain = []
+        seen = set()
+        while node not in resolved:
+            if node == start or node in seen or is_accept(node):
+                break
+            out = list(successors(node))
+            if len(out) != 1 or out[0][0] is not None:
+                break
+            seen.add(node)
+            chain.append(node)
+            node = out[0][1]
+        target = resolved.get(node, node)
+        resolved[node] = target
+        for skipped in chain:
+            resolved[skipped] = target
+        return target
+
+    index: Dict[Hashable, int] = {}
+    elided = set()
+    edges = 0
+    elided_edges = 0
+    # True once an edge points to the summary node
+    summary = False
+    queue = deque()
+
+    with open(path, 'w', encoding='utf-8') as out:
+        def declare(node):
+            idx = index[node] = len(index)
+            shape = 'doublecircle' if is_accept(node) else 'circle'
+            out.write(f'  q{idx} [label="q{idx}", shape={shape}];\n')
+            queue.append(node)
+            return idx
+
+        out.write(f'// {view.title}\ndigraph {_quote(view.title)} {{\n')
+        out.write('  rankdir=LR;\n  size="8,5";\n')
+        out.write('  start [shape=point];\n')
+        declare(start)
+        out.write('  start -> q0;\n')
+
+        while queue and edges < max_edges:
+            node = queue.popleft()
+            src = index[node]
+
+            # Group labels per (collapsed) target to merge parallel edges
+            grouped: Dict[Hashable, List[Optional[str]]] = {}
+            for label, target in successors(node):
+                grouped.setdefault(resolve(target), []).append(label)
+
+            overflow: List[Optional[str]] = []
+            for target, labels in grouped.items():
+                idx = index.get(target)
+                if edges >= max_edges:
+                    # Past the edge cap a new target is not declared: nothing would point to it
+                    if idx is None:
+                        elided.add(target)
+                    elided_edges += 1
+                    continue
+                if idx is None:
+                    if len(index) >= max_nodes:
+                        elided.add(target)
+                        overflow.extend(labels)
+                        continue
+                    idx = declare(target)
+                out.write(f'  q{src} -> q{idx} [label={_quote(format_labels(labels))}];\n')
+                edges += 1
+            if overflow:
+                # The summary edge counts like any other toward max_edges
+                if edges >= max_edges:
+                    elided_edges += 1
+                else:
+                    out.write(f'  q{src} -> more [label={_quote(format_labels(overflow))}, style=dashed];\n')
+                    edges += 1
+                    summary = True
+
+        if queue:
+            # Edge cap reached: states still waiting were declared but not expanded
+            out.write(f'  // edge limit {max_edges} reached, {len(queue)} states not expanded\n')
+            for node in queue:
+                for _, target in successors(node):
+                    elided_edges += 1
+                    target = resolve(target)
+                    if target not in index:
+                        elided.add(target)
+        if summary:
+            out.write(f'  more [shape=box, style=dashed, label="… {len(elided)}+ more states"];\n')
+        elif elided:
+            out.write(f'  // {len(elided)}+ more states not drawn\n')
+        out.write('}\n')
+
+    collapsed = sum(1 for node, target in resolved.items() if node != target)
+    return ExportStats(len(index), edges, len(elided), elided_edges, collapsed)
+
+
+# Rendering runs one job at a time in a background thread so the caller never waits on `dot`
+_render_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _render(dot_path: str, format: str, engine: str, view: bool) -> str:
+    import graphviz  # only needed once something is actually rendered
+    rendered = graphviz.render(engine, format, dot_path)
+    if view:
+        graphviz.view(rendered)
+    return rendered
+
+
+def render_async(dot_path, format: str = 'png', engine: str = 'dot', view: bool = False) -> Future:
+    """Render a DOT file in the background; the Future resolves to the output file path."""
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='graphviz-render')
+    return _render_executor.submit(_render, str(dot_path), format, engine, view)
+
+
+def test_edge_cap():
+    """Past max_edges no state is declared without an edge into it; skipped states are counted as elided."""
+    print("\nTesting the DOT edge cap...")
+    import os
+    import re
+    import tempfile
+    from pattern_cache import compile_regex
+    # The start state has five targets: the cap is hit halfway through its edges
+    dfa = compile_regex('(ab|cd|ef|gh|ij)k*').dfa
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'capped.gv')
+        stats = write_dot(dfa_view(dfa), path, max_edges=2)
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+    declared = set(re.findall(r'^  q(\d+) \[', source, re.M))
+    targets = set(re.findall(r'-> q(\d+) ', source))
+    assert stats.edges == 2 and stats.nodes == len(declared)
+    assert declared - {'0'} <= targets, "a state was declared with no edge into it"
+    assert stats.elided_nodes > 0 and stats.truncated
+    print(f"  {stats}")
@@ -0,0 +1,165 @@
+"""
+Counting, enumerating and sampling the strings a DFA accepts.
+
+Everything is driven by one table, ways[n][state]: the number of strings of
+length n accepted from state, computed by DP over the transition table
+(ways[0] is the accepting vector, ways[n] sums ways[n-1] over the successors)
+and extended one length at a time as it is needed. With it:
+
+- counting strings of length n is ways[n][start];
+- enumeration walks the DFA depth-first in alphabet order and skips every
+  branch with no accepted completion, so each string is produced without
+  dead ends and nothing is kept in memory besides the current prefix;
+- sampling picks each character with probability proportional to the number
+  of completions behind it, which makes every string of that length equally
+  likely.
+
+Counts are Python ints, so huge languages are counted exactly.
+"""
+import itertools
+import random
+from typing import Iterator, List, Optional
+
+from dfa import DEAD, DFA
+from dfa_ops import Automaton, materialize
+
+
+class AcceptedStrings:
+    """The language of a DFA, with the ways[] table grown lazily."""
+
+    def __init__(self, automaton: Automaton):
+        self.dfa = automaton if isinstance(automaton, DFA) else materialize(automaton)
+        dfa = self.dfa
+        # Live successors of every state, by symbol, with multiplicity
+        self._successors: List[List[int]] = [
+            [target for target in dfa.table[state * dfa.num_symbols:(state + 1) * dfa.num_symbols]
+             if target != DEAD]
+            for state in range(dfa.num_states)
+        ]
+        self._ways: List[List[int]] = [[int(bool(accept)) for accept in dfa.accepting]]
+
+    def _ways_at(self, length: int) -> List[int]:
+        ways = self._ways
+        while len(ways) <= length:
+            previous = ways[-1]
+            ways.append([sum(previous[target] for target in successors)
+                         for successors in self._successors])
+        return ways[length]
+
+    def count(self, length: int) -> int:
+        """Number of accepted strings of exactly this length"""
+        return self._ways_at(length)[self.dfa.start]
+
+    def counts(self, max_length: int) -> List[int]:
+        """Number of accepted strings of each length 0..max_length"""
+        return [self.count(length) for length in range(max_length + 1)]
+
+    def has_longer(self, length: int) -> bool:
+        """
+        True if some accepted string is at least this long. The shortest such
+        string is shorter than length + num_states (a longer one would repeat a
+        state after position `length`, and cutting out the loop keeps it accepted),
+        so it is enough to look at that window.
+        """
+        return any(self.count(n) for n in range(length, length + self.dfa.num_states + 1))
+
+    def of_length(self, length: int) -> Iterator[str]:
+        """Accepted strings of exactly this length, in lexicographic (alphabet) order"""
+        if not self.count(length):
+            return
+        dfa = self.dfa
+        alphabet = dfa.alphabet
+        table = dfa.table
+        num_symbols = dfa.num_symbols
+        ways = [self._ways_at(n) for n in range(length + 1)]
+
+        # Depth-first over (state, next symbol to try); prefix holds the characters read
+        prefix: List[str] = []
+        stack = [[dfa.start, 0]]
+        while stack:
+            frame = stack[-1]
+            depth = len(stack) - 1
+            if depth == length:
+                yield ''.join(prefix)
+                stack.pop()
+                if prefix:
+                    prefix.pop()
+                continue
+            state, symbol = frame
+            remaining = ways[length - depth - 1]
+            while symbol < num_symbols:
+                target = table[state * num_symbols + symbol]
+                if target != DEAD and remaining[target]:
+                    break
+                symbol += 1
+            if symbol == num_symbols:
+                stack.pop()
+                if prefix:
+                    prefix.pop()
+                continue
+            frame[1] = symbol + 1
+            prefix.append(alphabet[symbol])
+            stack.append([table[state * num_symbols + symbol], 0])
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        All accepted strings in length-lexicographic order (shortest first, then
+        alphabetical). Infinite languages never stop; finite ones stop after the
+        longest string.
+        """
+        for length in itertools.count():
+            if not self.has_longer(length):
+                return
+            yield from self.of_length(length)
+
+    def sample(self, length: int, rng: Optional[random.Random] = None) -> str:
+        """A uniformly random accepted string of this length (ValueError if there is none)"""
+        if not self.count(length):
+            raise ValueError(f"No accepted string of length {length}")
+        rng = rng or random
+        dfa = self.dfa
+        num_symbols = dfa.num_symbols
+        state = dfa.start
+        chars = []
+        for remaining in range(length - 1, -1, -1):
+            ways = self._ways_at(remaining)
+            choice = rng.randrange(self._ways_at(remaining + 1)[state])
+            for symbol in range(num_symbols):
+                target = dfa.table[state * num_symbols + symbol]
+                if target == DEAD:
+                    continue
+                if choice < ways[target]:
+                    break
+                choice -= ways[target]
+            chars.append(dfa.alphabet[symbol])
+            state = target
+        return ''.join(chars)
+
+
+def accepted_strings(automaton: Automaton, max_length: Optional[int] = None) -> Iterator[str]:
+    """Stream accepted strings in length-lexicographic order, optionally up to max_length"""
+    language = AcceptedStrings(automaton)
+    if max_length is None:
+        return iter(language)
+    return itertools.chain.from_iterable(language.of_length(length) for length in range(max_length + 1))
+
+
+def count_accepted(automaton: Automaton, max_length: int) -> List[int]:
+    """Number of accepted strings of each length 0..max_length"""
+    return AcceptedStrings(automaton).counts(max_length)
+
+
+def sample_accepted(automaton: Automaton, length: int, k: int = 1,
+                    rng: Optional[random.Random] = None) -> List[str]:
+    """k independent uniform samples of accepted strings of the given length"""
+    language = AcceptedStrings(automaton)
+    return [language.sample(length, rng) for _ in range(k)]
+
+
+def test_enumeration():
+    print("\nTesting enumeration of accepted strings...")
+    for pattern in ["a(b|c)", "(a|b)*c", "1?0+"]:
+        language = AcceptedStrings(pattern)
+        first = list(itertools.islice(language, 6))
+        print(f"  {pattern!r}: first {first}, counts {language.counts(5)}, "
+              f"sample(5) {language.sample(5) if language.count(5) else None}")
@@ -1,7 +1,17 @@
-from enum import Enum 
 from token_1 import Token
 from token_type import TokenType
 
+# Operator characters and the token each one stands for; anything else is a literal
+_OPERATORS = {
+    '(': TokenType.LPAREN,
+    ')': TokenType.RPAREN,
+    '|': TokenType.OR,
+    '*': TokenType.STAR,
+    '+': TokenType.PLUS,
+    '?': TokenType.OPTIONAL,
+    'ε': TokenType.EPSILON,
+}
+
 # --- 2. The Corrected Lexer Class ---
 
 class Lexer:
@@ -29,45 +39,18 @@ class Lexer:
     def get_next_token(self) -> Token:
         # Loop to consume whitespace characters
         while self.current_char is not None:
-            if self.current_char.isspace():
-                self.advance()
+            char = self.current_char
+            self.advance()
+            if char.isspace():
                 continue
 
-            # Token recognition based on the character
-            if self.current_char == '(':
-                self.advance()
-                return Token(TokenType.LPAREN, '(')
-            elif self.current_char == ')':
-                self.advance()
-                return Token(TokenType.RPAREN, ')')
-            elif self.current_char == '|':
-                self.advance()
-                return Token(TokenType.OR, '|')
-            elif self.current_char == '*':
-                self.advance()
-                return Token(TokenType.STAR, '*')
-            elif self.current_char == '+':
-                self.advance()
-                return Token(TokenType.PLUS, '+')
-            elif self.current_char == '?':
-                self.advance()
-                return Token(TokenType.OPTIONAL, '?')
-            elif self.current_char == 'ε':
-                self.advance()                
-                return Token(TokenType.EPSILON, 'ε')
-            elif self.current_char.isdigit():
-                digit = self.current_char
-                self.advance()
-                return Token(TokenType.DIGIT, digit)
-            else:
-                char = self.current_char
-                self.advance()
-                return Token(TokenType.CHAR, char)
+            # Token recognition based on the character: one table lookup for
+            # the operators, then digits, and any other character is a literal
+            token_type = _OPERATORS.get(char)
+            if token_type is None:
+                token_type = TokenType.DIGIT if char.isdigit() else TokenType.CHAR
+            return Token(token_type, char)
         
-        # NOTE: Your original logic had an isdigit() check but returned 'char'.
-        # Assuming any character not matched above is a literal character.
-        # The isdigit() check is redundant if CHAR is the catch-all.
-        # Returning Token(TokenType.CHAR, char) is the correct catch-all.
         return Token(TokenType.END)
         
 # --- 3. Lexer Test Function (Corrected Indentation) ---
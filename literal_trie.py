@@ -0,0 +1,193 @@
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from nfa import NFA
+from state import State
+from dfa import DEAD, DFA
+
+# Characters the Lexer turns into operators; anything else is a literal
+_OPERATOR_CHARS = set('()*+?')
+
+
+class LiteralTrie:
+    """
+    Word list compiled into a trie: node 0 is the root, goto[node] maps a
+    character to the child node and word_at[node] is the index of the word
+    ending there (-1 if none). Building is linear in the total word length and
+    a lookup walks one node per character, whatever the number of words.
+    After build_links() it also supports Aho-Corasick search over text.
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.word_at: List[int] = [-1]
+        self.words: List[str] = []
+        self.fail: Optional[List[int]] = None
+        self.output_link: Optional[List[int]] = None
+        for word in words:
+            self.add(word)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.goto)
+
+    def add(self, word: str) -> int:
+        """Insert a word, returns the index of the word (an existing index for duplicates)."""
+        node = 0
+        for ch in word:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.word_at.append(-1)
+            node = nxt
+        if self.word_at[node] < 0:
+            self.word_at[node] = len(self.words)
+            self.words.append(word)
+        self.fail = None
+        return self.word_at[node]
+
+    def overlaps(self, word: str) -> bool:
+        """True if a word of the trie is a prefix of word, or word is a prefix of one (duplicates too)."""
+        node = 0
+        goto = self.goto
+        word_at = self.word_at
+        for ch in word:
+            node = goto[node].get(ch)
+            if node is None:
+                return False
+            if word_at[node] >= 0:
+                return True
+        # Ends on a node where no word ends: an inner node, word is a prefix of a longer word
+        return True
+
+    def match(self, text: str) -> bool:
+        """True if text is one of the words"""
+        node = 0
+        goto = self.goto
+        for ch in text:
+            node = goto[node].get(ch)
+            if node is None:
+                return False
+        return self.word_at[node] >= 0
+
+    def build_links(self):
+        """Aho-Corasick failure links (longest proper suffix that is a trie node) and output links."""
+        fail = [0] * len(self.goto)
+        output_link = [-1] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                link = fail[node]
+                while link and ch not in self.goto[link]:
+                    link = fail[link]
+                target = self.goto[link].get(ch, 0)
+                fail[child] = target if target != child else 0
+                # Nearest node on the failure chain where a word ends
+                output_link[child] = fail[child] if self.word_at[fail[child]] >= 0 else output_link[fail[child]]
+                queue.append(child)
+        self.fail = fail
+        self.output_link = output_link
+
+    def search(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield (start, end, word index) for every occurrence of every word, overlaps included."""
+        if self.fail is None:
+            self.build_links()
+        goto = self.goto
+        fail = self.fail
+        output_link = self.output_link
+        word_at = self.word_at
+        words = self.words
+
+        node = 0
+        for end, ch in enumerate(text, start=1):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if word_at[node] >= 0 else output_link[node]
+            while hit > 0:
+                word = word_at[hit]
+                yield end - len(words[word]), end, word
+                hit = output_link[hit]
+
+    def to_nfa(self) -> NFA:
+        """Trie as a Thompson fragment: every word end has an ε edge to one shared accept state."""
+        states = [State() for _ in self.goto]
+        accept = State(is_accept = True)
+        word_at = self.word_at
+        for state, edges, word in zip(states, self.goto, word_at):
+            # A trie node has one child per character: fill the dicts directly
+            if edges:
+                state.transitions = {ch: {states[child]} for ch, child in edges.items()}
+            if word >= 0:
+                state.epsilon_transitions[accept] = None
+        return NFA(states[0], accept)
+
+    def to_dfa(self) -> DFA:
+        """
+        Trie as a minimal DFA (a DAWG): nodes with the same finality and the same
+        transitions to equivalent nodes are merged, so shared suffixes are stored once.
+        """
+        alphabet = sorted({ch for edges in self.goto for ch in edges})
+        symbol_index = {ch: i for i, ch in enumerate(alphabet)}
+
+        # Children always have bigger ids than their parent, so walking the ids
+        # backwards visits every node after all of its descendants
+        canonical = [0] * len(self.goto)
+        registry: Dict[tuple, int] = {}
+        classes: List[tuple] = []
+        for node in range(len(self.goto) - 1, -1, -1):
+            signature = (self.word_at[node] >= 0,
+                         tuple(sorted((ch, canonical[child]) for ch, child in self.goto[node].items())))
+            class_id = registry.get(signature)
+            if class_id is None:
+                class_id = registry[signature] = len(classes)
+                classes.append(signature)
+            canonical[node] = class_id
+
+        num_symbols = len(alphabet)
+        table = [DEAD] * (len(classes) * num_symbols)
+        accepting = []
+        for class_id, (is_word, edges) in enumerate(classes):
+            accepting.append(is_word)
+            for ch, target in edges:
+                table[class_id * num_symbols + symbol_index[ch]] = target
+        return DFA(alphabet, table, accepting, canonical[0])
+
+    def __repr__(self):
+        return f"LiteralTrie(words={len(self.words)}, nodes={self.num_nodes})"
+
+
+def compile_literals(words: Iterable[str]) -> LiteralTrie:
+    """Compile a word list (e.g. a denylist) into a trie; see LiteralTrie."""
+    return LiteralTrie(words)
+
+
+def literal_alternatives(pattern: str) -> Optional[List[str]]:
+    """
+    The words of a pattern made only of literals and '|' (w1|w2|...), read the
+    way the Lexer reads them (whitespace skipped), or None for any other pattern.
+    """
+    if _OPERATOR_CHARS.intersection(pattern):
+        return None
+    words = [''.join(word.split()) for word in pattern.split('|')]
+    if not all(words):
+        return None  # empty alternatives are left to the Parser to report
+    return words
+
+
+def prefix_free_runs(words: Iterable[str]) -> List[LiteralTrie]:
+    """
+    The words, in order, cut into consecutive runs compiled into tries in
+    which no word is a prefix of another. At most one word of a run can start
+    a given text, so an alternation of the run tries, in order, keeps the
+    left-first priority of the words.
+    """
+    runs = [LiteralTrie()]
+    for word in words:
+        if runs[-1].overlaps(word):
+            runs.append(LiteralTrie())
+        runs[-1].add(word)
+    return runs
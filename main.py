@@ -1,12 +1,25 @@
-import graphviz
+import itertools
+
 from lexer import Lexer, test_lexer
 from regex_parser import Parser, test_parser
 from nfa import NFA
 from state import State
 from nfa_builder import NFABuilder, test_nfa_builder
+from pike_vm import test_pike_vm
+from dfa import DFA
+from enumeration import accepted_strings, test_enumeration
+from tokenizer import test_tokenizer
+from dot_export import DEFAULT_MAX_EDGES, DEFAULT_MAX_NODES, render_async, thompson_view, write_dot
 from pathlib import Path
-import glob
-from collections import deque
+
+
+def _report_render(future):
+    """Done-callback for background renders: report where the image went."""
+    try:
+        print(f"\n📊 NFA Thompson visualization saved as: {future.result()}")
+    except Exception as e:
+        print(f"\nGraphviz rendering failed: {e}")
+
 
 class RegexToNFAConverter:
     def __init__(self):
@@ -31,85 +44,35 @@ class RegexToNFAConverter:
         """Convenience: render to default filename nfa_thompson"""
         self.visualize_with_graphviz("result/nfa_thompson")
     
-    def visualize_with_graphviz(self, filename: str = "result/nfa_thompson"):
+    def visualize_with_graphviz(self, filename: str = "result/nfa_thompson",
+                                max_nodes: int = DEFAULT_MAX_NODES, max_edges: int = DEFAULT_MAX_EDGES):
         """
-        Render the current NFA with Graphviz. States are labeled q0..qN in BFS order
-        starting from the start state. Old files with the same basename are removed
-        before rendering.
+        Stream the current NFA as DOT source to <filename>.gv and render it to png in
+        a background thread, so the prompt stays usable while Graphviz works.
+        States are labeled q0..qN in BFS order starting from the start state; big
+        NFAs are summarized (ε-chains collapsed, parallel edges merged, node and
+        edge caps). Bare file names go to the "result" folder.
+        Returns the Future of the render (resolves to the png path).
         """
         if not self.nfa:
             print("No NFA to visualize. Convert a regex first.")
             return
 
-        # Remove previous files with same base name (png, svg, gv, etc.)
-        base = Path(filename)
-        pattern = str(base.with_suffix("") ) + ".*"
-        for old in glob.glob(pattern):
-            try:
-                Path(old).unlink()
-            except Exception:
-                pass
-
-        # Collect states by BFS from start to ensure q0 is the start and numbering is consecutive
-        start = self.nfa.start
-        visited = []
-        seen = set()
-        q = deque([start])
-        seen.add(start)
-        while q:
-            s = q.popleft()
-            visited.append(s)
-            # enqueue epsilon and normal transitions
-            for nxt in s.epsilon_transitions:
-                if nxt not in seen:
-                    seen.add(nxt)
-                    q.append(nxt)
-            for dests in s.transitions.values():
-                for nxt in dests:
-                    if nxt not in seen:
-                        seen.add(nxt)
-                        q.append(nxt)
+        dot_path = Path(filename)
+        if not dot_path.parent.parts:
+            dot_path = Path("result") / dot_path
+        dot_path.parent.mkdir(parents=True, exist_ok=True)
+        dot_path = dot_path.with_name(dot_path.name + ".gv")
 
-        # Map each state to sequential label index: q0, q1, ...
-        state_index = {s: idx for idx, s in enumerate(visited)}
+        stats = write_dot(thompson_view(self.nfa), dot_path, max_nodes, max_edges)
+        summary = f"{stats.nodes} states, {stats.edges} edges"
+        if stats.truncated:
+            summary += f", {stats.elided_nodes} states / {stats.elided_edges} edges left out"
+        print(f"📝 DOT source written to {dot_path} ({summary}), rendering in background...")
 
-        # Build Graphviz graph
-        dot = graphviz.Digraph(comment='NFA Thompson Construction')
-        dot.attr(rankdir='LR', size='8,5')
-
-        # Invisible start arrow to q0
-        dot.node('start', shape='point')
-        dot.edge('start', f"q{state_index[self.nfa.start]}", label='')
-
-        # Nodes with accept doublecircle
-        for s, idx in state_index.items():
-            shape = 'doublecircle' if s.is_accept else 'circle'
-            dot.node(f"q{idx}", label=f"q{idx}", shape=shape)
-
-        # Edges: transitions and epsilons
-        for s in visited:
-            src = f"q{state_index[s]}"
-            # normal transitions
-            for ch, dests in s.transitions.items():
-                for d in dests:
-                    dst = f"q{state_index[d]}"
-                    dot.edge(src, dst, label=str(ch))
-            # epsilon transitions
-            for d in s.epsilon_transitions:
-                dst = f"q{state_index[d]}"
-                dot.edge(src, dst, label='ε')
-
-        # Render and cleanup intermediate files
-        out = dot.render(filename, "result/", format='png', cleanup=True)
-        print(f"📊 NFA Thompson visualization saved as: {out}")
-        
-        # Also display in the console
-        print("Graphviz NFA Structure:")
-        print(dot.source)
-        hey: dict= dot.source.split("// NFA Thompson Construction")[1]
-        print(hey)
-        
-        return dot
+        future = render_async(dot_path, format='png')
+        future.add_done_callback(_report_render)
+        return future
 
 # Test the complete converter
 def test_converter():
@@ -211,21 +174,11 @@ def demo_thompson_patterns():
         try:
             nfa = converter.convert(pattern)
             
-            # Test a few strings
-            test_cases = {
-                "a": ["a"],
-                "a*": ["", "a", "aa"],
-                "a+": ["a", "aa"],
-                "a?": ["", "a"],
-                "a|b": ["a", "b"],
-                "ab": ["ab"],
-                "a(b|c)": ["ab", "ac"]
-            }
-            
-            if pattern in test_cases:
-                for test_str in test_cases[pattern]:
-                    result = nfa.simulate(test_str)
-                    print(f"  '{test_str}' -> {'✅' if result else '❌'}")
+            # Test the first few strings the pattern accepts, and one it rejects
+            accepted = list(itertools.islice(accepted_strings(DFA.from_nfa(nfa)), 3))
+            for test_str in accepted + [pattern + "!"]:
+                result = nfa.simulate(test_str)
+                print(f"  '{test_str}' -> {'✅' if result else '❌'}")
             
             # Generate visualization
             filename = f"thompson_{pattern.replace('|', '_or_').replace('*', '_star')}"
@@ -252,6 +205,9 @@ def main():
         test_parser("a+1? (c|d)* ε")
         test_nfa_builder()
         test_converter()
+        test_pike_vm()
+        test_enumeration()
+        test_tokenizer()
     else:
         interactive_demo()
 
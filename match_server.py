@@ -0,0 +1,486 @@
+"""
+Local matching sidecar: an asyncio server speaking line-delimited JSON over TCP
+or a Unix socket, plus a pipelining client and a small load generator.
+
+Protocol (one JSON object per line, responses carry the request id back):
+    {"id": 1, "pattern": "(a|b)*c", "text": "abac"}  ->  {"id": 1, "match": true, "latency_ms": 0.41}
+    {"id": 2, "op": "stats"}                          ->  {"id": 2, "stats": {...}}
+Failures come back as {"id": ..., "error": "..."}.
+
+    python match_server.py serve --port 8765
+    python match_server.py match "(a|b)*c" abac bbb
+    python match_server.py load --pattern "(a|b)*c" --requests 20000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+from budgets import Budget, MatchStepsExceeded
+from pattern_cache import PatternCache, compile_pattern
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 64
+DEFAULT_BATCH_DELAY = 0.002  # seconds a batch waits for more requests on the same pattern
+DEFAULT_MAX_PENDING = 1024   # requests in flight before the server stops reading sockets
+MAX_LINE = 1 << 20
+
+# Patterns come from clients, so they are compiled and matched under the default budgets
+tenant_cache = PatternCache(budget=Budget())
+
+
+def match_batch(pattern: str, texts: List[str]) -> List[Union[bool, MatchStepsExceeded]]:
+    """
+    Executor job: compile through the (per-process) tenant cache and match every text.
+    A text over the match step budget gets the exception instead of a result.
+    """
+    compiled = compile_pattern(pattern, tenant_cache)
+    results: List[Union[bool, MatchStepsExceeded]] = []
+    for text in texts:
+        try:
+            results.append(compiled.match(text))
+        except MatchStepsExceeded as e:
+            results.append(e)
+    return results
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class LatencyStats:
+    """Request and batch counters plus a window of recent latencies for percentiles."""
+
+    def __init__(self, window: int = 10000):
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, latency: float, error: bool = False):
+        self.requests += 1
+        if error:
+            self.errors += 1
+        self.total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+        self.recent.append(latency)
+
+    def record_batch(self, size: int):
+        self.batches += 1
+        self.batched_requests += size
+
+    def snapshot(self) -> dict:
+        recent = sorted(self.recent)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'batches': self.batches,
+            'mean_batch': self.batched_requests / self.batches if self.batches else 0.0,
+            'mean_ms': 1000 * self.total_latency / self.requests if self.requests else 0.0,
+            'p50_ms': 1000 * _percentile(recent, 0.50),
+            'p99_ms': 1000 * _percentile(recent, 0.99),
+            'max_ms': 1000 * self.max_latency,
+        }
+
+
+async def _read_line(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """
+    Next request line, b'' at end of stream, or None for a line longer than
+    MAX_LINE: it is skipped up to its newline so the requests after it still work.
+    """
+    try:
+        return await reader.readuntil(b'\n')
+    except asyncio.IncompleteReadError as e:
+        return e.partial  # last line without a newline, or b''
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        # The oversized data is still buffered: drop it and look for the newline again
+        try:
+            await reader.readexactly(consumed)
+            await reader.readuntil(b'\n')
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+
+
+class MatchServer:
+    """
+    Match requests are grouped per pattern into micro-batches (flushed after
+    batch_delay seconds or max_batch requests) and run on a thread or process pool.
+    At most max_pending requests are in flight; past that the server stops reading
+    from its sockets, so slow matching pushes back on clients through TCP.
+    """
+
+    def __init__(self, workers: Optional[int] = None, use_processes: bool = False,
+                 max_batch: int = DEFAULT_MAX_BATCH, batch_delay: float = DEFAULT_BATCH_DELAY,
+                 max_pending: int = DEFAULT_MAX_PENDING, executor: Optional[Executor] = None):
+        if executor is None:
+            executor = ProcessPoolExecutor(workers) if use_processes else ThreadPoolExecutor(workers)
+        self.executor = executor
+        self.max_batch = max_batch
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.stats = LatencyStats()
+        self._batches: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._pending: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    async def start(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                    path: Optional[str] = None) -> asyncio.AbstractServer:
+        """Listen on a Unix socket if path is given, else on host:port (port 0 picks a free one)."""
+        self._pending = asyncio.Semaphore(self.max_pending)
+        if path:
+            self._server = await asyncio.start_unix_server(self._handle, path=path, limit=MAX_LINE)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port, limit=MAX_LINE)
+        return self._server
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname() if self._server else None
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # Closing the sockets ends every connection loop on its next read
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    def match(self, pattern: str, text: str) -> "asyncio.Future[bool]":
+        """Queue one text into the current batch of its pattern."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._batches.get(pattern)
+        if batch is None:
+            batch = self._batches[pattern] = []
+            self._timers[pattern] = loop.call_later(self.batch_delay, self._flush, pattern)
+        batch.append((text, future))
+        if len(batch) >= self.max_batch:
+            self._flush(pattern)
+        return future
+
+    def _flush(self, pattern: str):
+        timer = self._timers.pop(pattern, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._batches.pop(pattern, None)
+        if batch:
+            asyncio.ensure_future(self._run_batch(pattern, batch))
+
+    async def _run_batch(self, pattern: str, batch: List[Tuple[str, asyncio.Future]]):
+        self.stats.record_batch(len(batch))
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self.executor, match_batch, pattern, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        handler = asyncio.current_task()
+        self._connections[handler] = writer
+        try:
+            while True:
+                try:
+                    line = await _read_line(reader)
+                except ConnectionError:
+                    break
+                if line == b'':
+                    break
+                # Backpressure: a line waits for a pending slot before the next one is read
+                # (idle connections hold no slot)
+                await self._pending.acquire()
+                task = asyncio.ensure_future(
+                    self._respond(line, time.perf_counter(), writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            del self._connections[handler]
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _respond(self, line: Optional[bytes], received: float, writer: asyncio.StreamWriter,
+                       write_lock: asyncio.Lock):
+        """Answer one request line (None: the line was over MAX_LINE and was dropped)."""
+        try:
+            if line is None:
+                response = {'id': None, 'error': f"Request line longer than {MAX_LINE} bytes"}
+            else:
+                response = await self._dispatch(line)
+            if 'stats' not in response:
+                latency = time.perf_counter() - received
+                self.stats.record(latency, error='error' in response)
+                response['latency_ms'] = round(1000 * latency, 3)
+            data = (json.dumps(response) + '\n').encode('utf-8')
+            async with write_lock:
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._pending.release()
+
+    async def _dispatch(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {'id': None, 'error': f"Invalid JSON: {e}"}
+        if not isinstance(request, dict):
+            return {'id': None, 'error': "Request must be a JSON object"}
+
+        request_id = request.get('id')
+        op = request.get('op', 'match')
+        if op == 'stats':
+            return {'id': request_id, 'stats': self.stats.snapshot()}
+        if op != 'match':
+            return {'id': request_id, 'error': f"Unknown op {op!r}"}
+
+        pattern = request.get('pattern')
+        text = request.get('text')
+        if not isinstance(pattern, str) or not isinstance(text, str):
+            return {'id': request_id, 'error': "'pattern' and 'text' must be strings"}
+        try:
+            matched = await self.match(pattern, text)
+        except Exception as e:
+            return {'id': request_id, 'error': f"{type(e).__name__}: {e}"}
+        return {'id': request_id, 'match': matched}
+
+
+class MatchClient:
+    """Pipelining client: any number of requests can be in flight on one connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._waiting: Dict[int, asyncio.Future] = {}
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                      path: Optional[str] = None) -> "MatchClient":
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path, limit=MAX_LINE)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+        return cls(reader, writer)
+
+    async def request(self, payload: dict) -> dict:
+        """Send one request and wait for its response; raises ValueError for a line over MAX_LINE."""
+        request_id = next(self._ids)
+        line = (json.dumps(dict(payload, id=request_id)) + '\n').encode('utf-8')
+        if len(line) > MAX_LINE:
+            # The server would drop it and could not tell which request to answer
+            raise ValueError(f"Request line of {len(line)} bytes is over the {MAX_LINE} byte limit")
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(line)
+        await self._writer.drain()
+        return await future
+
+    async def match(self, pattern: str, text: str) -> bool:
+        response = await self.request({'pattern': pattern, 'text': text})
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response['match']
+
+    async def stats(self) -> dict:
+        return (await self.request({'op': 'stats'}))['stats']
+
+    async def close(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        self._receiver.cancel()
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                request_id = response.get('id')
+                if request_id is None and 'error' in response:
+                    # An error the server could not tie to a request: no waiting
+                    # request can be answered for sure, fail them all
+                    for future in self._waiting.values():
+                        if not future.done():
+                            future.set_exception(ValueError(response['error']))
+                    self._waiting.clear()
+                    continue
+                future = self._waiting.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection to match server closed"))
+            self._waiting.clear()
+
+
+async def run_load(pattern: str, texts: List[str], requests: int = 10000, concurrency: int = 64,
+                   host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                   path: Optional[str] = None) -> dict:
+    """Send `requests` match requests with `concurrency` in flight and report throughput and latency."""
+    client = await MatchClient.connect(host, port, path)
+    latencies: List[float] = []
+    remaining = iter(range(requests))
+
+    async def worker():
+        for i in remaining:
+            started = time.perf_counter()
+            await client.match(pattern, texts[i % len(texts)])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    server_stats = await client.stats()
+    await client.close()
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'seconds': elapsed,
+        'throughput': requests / elapsed if elapsed else 0.0,
+        'p50_ms': 1000 * _percentile(latencies, 0.50),
+        'p99_ms': 1000 * _percentile(latencies, 0.99),
+        'max_ms': 1000 * latencies[-1] if latencies else 0.0,
+        'server': server_stats,
+    }
+
+
+def random_texts(pattern: str, count: int = 1000, max_length: int = 32) -> List[str]:
+    """Random strings over the pattern's alphabet, a mix of matches and non-matches."""
+    alphabet = compile_pattern(pattern).dfa.alphabet or ['a']
+    return [''.join(random.choice(alphabet) for _ in range(random.randint(0, max_length)))
+            for _ in range(count)]
+
+
+def test_oversized_request():
+    """The client refuses a request line the server would drop, and the connection keeps working."""
+    print("\nTesting an oversized request...")
+
+    async def run():
+        server = MatchServer(workers=1)
+        await server.start(port=0)
+        client = await MatchClient.connect(*server.address[:2])
+        try:
+            try:
+                await asyncio.wait_for(client.match('(a|b)*c', 'a' * (3 << 20) + 'c'), timeout=5)
+            except ValueError as e:
+                print(f"  3 MB text refused: {e}")
+            else:
+                raise AssertionError("an oversized request was sent")
+            assert await asyncio.wait_for(client.match('(a|b)*c', 'abac'), timeout=5)
+        finally:
+            await client.close()
+            await server.close()
+
+    asyncio.run(run())
+
+
+async def _serve(args):
+    server = MatchServer(args.workers, args.processes, args.max_batch,
+                         args.batch_delay_ms / 1000, args.max_pending)
+    await server.start(args.host, args.port, args.unix)
+    print(f"Match server listening on {args.unix or server.address}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+async def _match(args):
+    client = await MatchClient.connect(args.host, args.port, args.unix)
+    for text in args.texts:
+        result = await client.match(args.pattern, text)
+        print(f"  '{text}' -> {'✅ ACCEPT' if result else '❌ REJECT'}")
+    await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regex matching sidecar server")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_address(p):
+        p.add_argument('--host', default='127.0.0.1')
+        p.add_argument('--port', type=int, default=DEFAULT_PORT)
+        p.add_argument('--unix', help="Unix socket path (instead of TCP)")
+
+    serve = sub.add_parser('serve', help="Run the server")
+    add_address(serve)
+    serve.add_argument('--workers', type=int, default=None)
+    serve.add_argument('--processes', action='store_true', help="Use a process pool instead of threads")
+    serve.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    serve.add_argument('--batch-delay-ms', type=float, default=DEFAULT_BATCH_DELAY * 1000)
+    serve.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING)
+
+    match = sub.add_parser('match', help="Match texts against a pattern on a running server")
+    add_address(match)
+    match.add_argument('pattern')
+    match.add_argument('texts', nargs='+')
+
+    load = sub.add_parser('load', help="Generate load against a running server")
+    add_address(load)
+    load.add_argument('--pattern', required=True)
+    load.add_argument('--text', action='append', dest='texts', help="Text to send (repeatable), random by default")
+    load.add_argument('--requests', type=int, default=10000)
+    load.add_argument('--concurrency', type=int, default=64)
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        try:
+            asyncio.run(_serve(args))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'match':
+        asyncio.run(_match(args))
+    else:
+        texts = args.texts or random_texts(args.pattern)
+        report = asyncio.run(run_load(args.pattern, texts, args.requests, args.concurrency,
+                                      args.host, args.port, args.unix))
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
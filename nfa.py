@@ -1,4 +1,4 @@
-from typing import Set
+from typing import Dict, List, Set, Tuple
 from state import State
 
 class NFA:
@@ -6,6 +6,28 @@ class NFA:
         self.start = start
         self.accept = accept
     
+    def number_states(self) -> Tuple[List[State], Dict[State, int]]:
+        """
+        States reachable from the start in BFS order (ε edges before character
+        edges) and the index of each: the integer ids every compiled form uses.
+        """
+        ids: Dict[State, int] = {self.start: 0}
+        states = [self.start]
+        i = 0
+        while i < len(states):
+            state = states[i]
+            for nxt in state.epsilon_transitions:
+                if nxt not in ids:
+                    ids[nxt] = len(states)
+                    states.append(nxt)
+            for dests in state.transitions.values():
+                for nxt in dests:
+                    if nxt not in ids:
+                        ids[nxt] = len(states)
+                        states.append(nxt)
+            i += 1
+        return states, ids
+    
     def get_epsilon_closure(self, states: Set[State]) -> Set[State]:
         """Get all states reachable via epsilon transitions"""
         closure = set(states)
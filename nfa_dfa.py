@@ -1,6 +1,14 @@
 # Conversion of epsilon-NFA to DFA and visualization using Graphviz
 
-from graphviz import Digraph
+import sys
+from collections import deque
+from typing import Dict, FrozenSet, List, Set, Tuple
+
+from dot_export import GraphView, render_async, sparse_view, write_dot
+from nfa_loader import SparseNFA, load
+
+# DFA state id of the dead state ϕ
+DEAD_STATE = -1
 
 class NFA:
     def __init__(self, no_state, states, no_alphabet, alphabets, start, no_final, finals, no_transition, transitions):
@@ -18,7 +26,6 @@ class NFA:
         self.finals = finals
         self.no_transition = no_transition
         self.transitions = transitions
-        self.graph = Digraph()
 
         # Dictionaries to get index of states or alphabets
         self.states_dict = dict()
@@ -29,16 +36,15 @@ class NFA:
             self.alphabets_dict[self.alphabets[i]] = i
             
         # transition table is of the form
-        # [From State + Alphabet pair] -> [Set of To States]
+        # (From State, Alphabet) pair -> [Set of To States]
+        # Only pairs that actually have transitions are stored,
+        # missing pairs are looked up with .get(key, [])
         self.transition_table = dict()
-        for i in range(self.no_state):
-            for j in range(self.no_alphabet):
-                self.transition_table[str(i)+str(j)] = []
         for i in range(self.no_transition):
-            self.transition_table[str(self.states_dict[self.transitions[i][0]])
-                                  + str(self.alphabets_dict[
-                                      self.transitions[i][1]])].append(
-                                          self.states_dict[self.transitions[i][2]])
+            key = (self.states_dict[self.transitions[i][0]],
+                   self.alphabets_dict[self.transitions[i][1]])
+            self.transition_table.setdefault(key, []).append(
+                self.states_dict[self.transitions[i][2]])
 
     # Method to get input from User
     @classmethod
@@ -58,6 +64,20 @@ class NFA:
         return cls(no_state, states, no_alphabet, alphabets, start,
                    no_final, finals, no_transition, transitions)
 
+    # Method to get the SparseNFA that build_dfa works on
+    # (files are loaded straight into one, see nfa_loader)
+    def toSparse(self):
+        sparse = SparseNFA(epsilon='e')
+        for state in self.states:
+            sparse.add_state(state)
+        for alphabet in self.alphabets[:-1]:
+            sparse.add_symbol(alphabet)
+        sparse.add_transitions(self.transitions)
+        sparse.set_start(self.start)
+        for final in self.finals:
+            sparse.add_final(final)
+        return sparse
+
     # Method to represent quintuple
     def __repr__(self):
         return "Q : " + str(self.states)+"\nΣ : " + str(self.alphabets)+"\nq0 : " + str(self.start)+"\nF : "+str(self.finals) + "\nδ : \n" + str(self.transition_table)
@@ -79,8 +99,8 @@ class NFA:
             
             # For the epsilon transition of that state,
             # if not present in closure array then add to dict and push to stack
-            for x in self.transition_table[
-                    str(cur)+str(self.alphabets_dict['e'])]:
+            for x in self.transition_table.get(
+                    (cur, self.alphabets_dict['e']), []):
                 if x not in closure.keys():
                     closure[x] = 0
                     closure_stack.append(x)
@@ -106,152 +126,143 @@ class NFA:
         return False
 
 
-print("E-NFA to DFA")
-
-# INPUT
-# Number of States : no_state
-# Array of States : states
-# Number of Alphabets : no_alphabet
-# Array of Alphabets : alphabets
-# Start State : start
-# Number of Final States : no_final
-# Array of Final States : finals
-# Number of Transitions : no_transition
-# Array of Transitions : transitions
-
-# nfa = NFA(
-#     4,  # number of states
-#     ['A', 'B', 'C', 'D'],  # array of states
-#     3,  # number of alphabets
-#     ['a', 'b', 'c'],  # array of alphabets
-#     'A',  # start state
-#     1,  # number of final states
-#     ['D'],  # array of final states
-#     7,  # number of transitions
-#     [['A', 'a', 'A'], ['A', 'e', 'B'], ['B', 'b', 'B'],
-#      ['A', 'e', 'C'], ['C', 'c', 'C'], ['B', 'b', 'D'],
-#      ['C', 'c', 'D']]
+def build_dfa(nfa: SparseNFA) -> Tuple[List[Dict[int, int]], Set[int]]:
+    """
+    Subset construction on the SparseNFA ids. DFA state i is the i-th epsilon
+    closure reached (0 is the start): edges[i] maps a symbol id to the next DFA
+    state and finals holds the DFA states containing an NFA final state.
+    Symbols without a move are left out, they lead to the dead state ϕ.
+    """
+    transitions = nfa.transitions
+    start = frozenset(nfa.get_epsilon_closure((nfa.start,)))
+
+    # DFA states are looked up by their set of NFA states, and evaluated in
+    # the order they are found (so the id of the next one is len(edges))
+    dfa_ids: Dict[FrozenSet[int], int] = {start: 0}
+    dfa_queue = deque([start])
+    edges: List[Dict[int, int]] = []
+    finals: Set[int] = set()
+
+    while dfa_queue:
+        cur_state = dfa_queue.popleft()
+        if not nfa.finals.isdisjoint(cur_state):
+            finals.add(len(edges))
+
+        # Group the moves of every NFA state in the set by symbol
+        moves: Dict[int, Set[int]] = {}
+        for x in cur_state:
+            table = transitions[x]
+            if table:
+                for symbol_id, targets in table.items():
+                    moves.setdefault(symbol_id, set()).update(targets)
+
+        row: Dict[int, int] = {}
+        for symbol_id, targets in moves.items():
+            to_state = frozenset(nfa.get_epsilon_closure(targets))
+            to_id = dfa_ids.get(to_state)
+            if to_id is None:
+                to_id = dfa_ids[to_state] = len(dfa_ids)
+                dfa_queue.append(to_state)
+            row[symbol_id] = to_id
+        edges.append(row)
+
+    return edges, finals
+
+
+def dfa_graph_view(nfa: SparseNFA, edges: List[Dict[int, int]], finals: Set[int]) -> GraphView:
+    """
+    View of the DFA built by build_dfa for dot_export. Every symbol without a
+    move goes to the dead state ϕ, which loops on every symbol.
+    """
+    symbols = nfa.symbols
+
+    def successors(state):
+        row = edges[state] if state != DEAD_STATE else {}
+        for symbol_id, symbol in enumerate(symbols):
+            yield symbol, row.get(symbol_id, DEAD_STATE)
+
+    return GraphView(0, successors, lambda state: state in finals, 'DFA')
+
+
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
+    print("E-NFA to DFA")
+
+    # INPUT
+    # Number of States : no_state
+    # Array of States : states
+    # Number of Alphabets : no_alphabet
+    # Array of Alphabets : alphabets
+    # Start State : start
+    # Number of Final States : no_final
+    # Array of Final States : finals
+    # Number of Transitions : no_transition
+    # Array of Transitions : transitions
+
+    # nfa = NFA(
+    #     4,  # number of states
+    #     ['A', 'B', 'C', 'D'],  # array of states
+    #     3,  # number of alphabets
+    #     ['a', 'b', 'c'],  # array of alphabets
+    #     'A',  # start state
+    #     1,  # number of final states
+    #     ['D'],  # array of final states
+    #     7,  # number of transitions
+    #     [['A', 'a', 'A'], ['A', 'e', 'B'], ['B', 'b', 'B'],
+    #      ['A', 'e', 'C'], ['C', 'c', 'C'], ['B', 'b', 'D'],
+    #      ['C', 'c', 'D']]
   
-#     # array of transitions with its element of type :
-#     # [from state, alphabet, to state]
-# )
-
-nfa = NFA.fromUser() # To get input from user
-print(repr(nfa)) # To print the quintuple in console
-
-# Making an object of Digraph to visualize NFA diagram
-nfa.graph = Digraph()
-
-# Adding states/nodes in NFA diagram
-for x in nfa.states:
-    # If state is not a final state, then border shape is single circle
-    # Else it is double circle
-    if (x not in nfa.finals):
-        nfa.graph.attr('node', shape='circle')
-        nfa.graph.node(x)
+    #     # array of transitions with its element of type :
+    #     # [from state, alphabet, to state]
+    # )
+
+    # To get input from a file: python nfa_dfa.py automaton.json (or .tsv / edge list),
+    # loaded straight into a SparseNFA. Otherwise to get input from user
+    if len(argv) > 1:
+        nfa = load(argv[1], epsilon='e')
+        print(repr(nfa)) # Sizes only, a file can hold millions of edges
     else:
-        nfa.graph.attr('node', shape='doublecircle')
-        nfa.graph.node(x)
-
-# Adding start state arrow in NFA diagram
-nfa.graph.attr('node', shape='none')
-nfa.graph.node('')
-nfa.graph.edge('', nfa.start)
-
-# Adding edge between states in NFA from the transitions array
-for x in nfa.transitions:
-    nfa.graph.edge(x[0], x[2], label=('ε', x[1])[x[1] != 'e'])
-
-# Makes a pdf with name nfa.graph.pdf and views the pdf
-# nfa.graph.render('nfa', view=True)
-
-# Making an object of Digraph to visualize DFA diagram
-dfa = Digraph()
-
-# Finding epsilon closure beforehand so to not recalculate each time
-epsilon_closure = dict()
-for x in nfa.states:
-    epsilon_closure[x] = list(nfa.getEpsilonClosure(x))
-
-
-# First state of DFA will be epsilon closure of start state of NFA
-# This list will act as stack to maintain till when to evaluate the states
-dfa_stack = list()
-dfa_stack.append(epsilon_closure[nfa.start])
-
-# Check if start state is the final state in DFA
-if (nfa.isFinalDFA(dfa_stack[0])):
-    dfa.attr('node', shape='doublecircle')
-else:
-    dfa.attr('node', shape='circle')
-dfa.node(nfa.getStateName(dfa_stack[0]))
-
-# Adding start state arrow to start state in DFA
-dfa.attr('node', shape='none')
-dfa.node('')
-dfa.edge('', nfa.getStateName(dfa_stack[0]))
-
-# List to store the states of DFA
-dfa_states = list()
-dfa_states.append(epsilon_closure[nfa.start])
-
-# Loop will run till this stack is not empty
-while (len(dfa_stack) > 0):
-    # Getting top of the stack for current evaluation
-    cur_state = dfa_stack.pop(0)
-
-    # Traversing through all the alphabets for evaluating transitions in DFA
-    for al in range((nfa.no_alphabet) - 1):
-        # Set to see if the epsilon closure of the set is empty or not
-        from_closure = set()
-        for x in cur_state:
-            # Performing Union update and adding all the new states in set
-            from_closure.update(
-                set(nfa.transition_table[str(x)+str(al)]))
-
-        # Check if epsilon closure of the new set is not empty
-        if (len(from_closure) > 0):
-            # Set for the To state set in DFA
-            to_state = set()
-            for x in list(from_closure):
-                to_state.update(set(epsilon_closure[nfa.states[x]]))
-
-            # Check if the to state already exists in DFA and if not then add it
-            if list(to_state) not in dfa_states:
-                dfa_stack.append(list(to_state))
-                dfa_states.append(list(to_state))
-
-                # Check if this set contains final state of NFA
-                # to get if this set will be final state in DFA
-                if (nfa.isFinalDFA(list(to_state))):
-                    dfa.attr('node', shape='doublecircle')
-                else:
-                    dfa.attr('node', shape='circle')
-                dfa.node(nfa.getStateName(list(to_state)))
-
-            # Adding edge between from state and to state
-            dfa.edge(nfa.getStateName(cur_state), nfa.getStateName(list(to_state)), label=nfa.alphabets[al])
-            
-        # Else case for empty epsilon closure
-        # This is a dead state(ϕ) in DFA
-        else:
-          
-            # Check if any dead state was present before this
-            # if not then make a new dead state ϕ
-            if (-1) not in dfa_states:
-                dfa.attr('node', shape='circle')
-                dfa.node('ϕ')
-
-                # For new dead state, add all transitions to itself,
-                # so that machine cannot leave the dead state
-                for alpha in range(nfa.no_alphabet - 1):
-                    dfa.edge('ϕ', 'ϕ', nfa.alphabets[alpha])
-
-                # Adding -1 to list to mark that dead state is present
-                dfa_states.append(-1)
-
-            # Adding transition to dead state
-            dfa.edge(nfa.getStateName(cur_state,), 'ϕ', label = nfa.alphabets[al])
-
-# Makes a pdf with name dfa.pdf and views the pdf
-dfa.render('dfa', view = True)
\ No newline at end of file
+        user_nfa = NFA.fromUser()
+        print(repr(user_nfa)) # To print the quintuple in console
+        nfa = user_nfa.toSparse()
+
+    # NFA diagram: streams the DOT source to nfa.gv and renders a pdf in the background
+    stats = write_dot(sparse_view(nfa, 'NFA'), 'nfa.gv', collapse_epsilon=False)
+    print(f"NFA written to nfa.gv ({stats.nodes} states, {stats.edges} edges), rendering pdf...")
+    render_async('nfa.gv', format='pdf', view=True)
+
+    dfa_edges, dfa_finals = build_dfa(nfa)
+
+    # Streams the DOT source to dfa.gv (large DFAs are summarized),
+    # then makes a pdf dfa.gv.pdf and views it from a background thread
+    stats = write_dot(dfa_graph_view(nfa, dfa_edges, dfa_finals), 'dfa.gv')
+    print(f"DFA written to dfa.gv ({stats.nodes} states, {stats.edges} edges), rendering pdf...")
+    render_async('dfa.gv', format='pdf', view=True)
+
+
+if __name__ == "__main__":
+    main()
+
+
+def test_build_dfa():
+    """The DFA built from the example NFA accepts exactly the strings the NFA accepts."""
+    print("\nTesting the subset construction...")
+    from itertools import product
+    nfa = NFA(4, ['A', 'B', 'C', 'D'], 3, ['a', 'b', 'c'], 'A', 1, ['D'], 7,
+              [['A', 'a', 'A'], ['A', 'e', 'B'], ['B', 'b', 'B'],
+               ['A', 'e', 'C'], ['C', 'c', 'C'], ['B', 'b', 'D'],
+               ['C', 'c', 'D']]).toSparse()
+    edges, finals = build_dfa(nfa)
+
+    def dfa_accepts(text):
+        state = 0
+        for ch in text:
+            state = edges[state].get(nfa.symbol_ids[ch], DEAD_STATE)
+            if state == DEAD_STATE:
+                return False
+        return state in finals
+
+    for length in range(6):
+        for text in product('abc', repeat=length):
+            assert dfa_accepts(text) == nfa.simulate(text), ''.join(text)
+    print(f"  {len(edges)} DFA states, agrees with the NFA on every string up to length 5")
@@ -0,0 +1,417 @@
+import gc
+import json
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Directive rows understood by the edge-list and TSV loaders.
+# Every other non-comment row is a transition: [from] [symbol] [to]
+_START_DIRECTIVE = '%start'
+_FINAL_DIRECTIVE = '%final'
+_STATES_DIRECTIVE = '%states'
+
+# Characters read from a JSON file at a time
+_JSON_CHUNK = 1 << 16
+_JSON_WHITESPACE = re.compile(r'[ \t\r\n]*')
+# What follows an array element: ',' or ']' and the whitespace around it
+_JSON_SEPARATOR = re.compile(r'[ \t\r\n]*([,\]])[ \t\r\n]*')
+_json_decoder = json.JSONDecoder()
+
+
+class SparseNFA:
+    """
+    Epsilon-NFA with integer state and symbol ids, built one edge at a time.
+
+    Only the transitions that actually exist are stored, so memory grows with
+    the number of edges instead of states x symbols. Per-state transition maps
+    are created lazily the first time a state gets an outgoing edge.
+    """
+
+    def __init__(self, epsilon: str = 'e'):
+        self.epsilon = epsilon
+        self.state_names: List[str] = []
+        self.state_ids: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        self.symbol_ids: Dict[str, int] = {}
+        # state id -> {symbol id -> [to state ids]}, None until the first edge
+        self.transitions: List[Optional[Dict[int, List[int]]]] = []
+        # state id -> [to state ids], None until the first epsilon edge
+        self.epsilon_transitions: List[Optional[List[int]]] = []
+        self.start: Optional[int] = None
+        self.finals: Set[int] = set()
+        self.num_edges = 0
+
+    def add_state(self, name: str) -> int:
+        """Return the id of a state, registering it on first use."""
+        state_id = self.state_ids.get(name)
+        if state_id is None:
+            state_id = len(self.state_names)
+            self.state_ids[name] = state_id
+            self.state_names.append(name)
+            self.transitions.append(None)
+            self.epsilon_transitions.append(None)
+        return state_id
+
+    def add_symbol(self, symbol: str) -> int:
+        """Return the id of an alphabet symbol, registering it on first use."""
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self.symbol_ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+        return symbol_id
+
+    def add_transition(self, src: str, symbol: str, dst: str):
+        from_id = self.add_state(src)
+        to_id = self.add_state(dst)
+
+        if symbol == self.epsilon:
+            targets = self.epsilon_transitions[from_id]
+            if targets is None:
+                targets = self.epsilon_transitions[from_id] = []
+            targets.append(to_id)
+        else:
+            symbol_id = self.add_symbol(symbol)
+            table = self.transitions[from_id]
+            if table is None:
+                table = self.transitions[from_id] = {}
+            targets = table.get(symbol_id)
+            if targets is None:
+                table[symbol_id] = [to_id]
+            else:
+                targets.append(to_id)
+        self.num_edges += 1
+
+    def add_transitions(self, edges: Iterable[Tuple[str, str, str]]):
+        """
+        add_transition for every (from, symbol, to) of edges. The loaders' hot
+        loop: ids already registered are looked up inline, without method calls.
+        """
+        epsilon = self.epsilon
+        state_ids = self.state_ids
+        symbol_ids = self.symbol_ids
+        transitions = self.transitions
+        epsilon_transitions = self.epsilon_transitions
+        count = 0
+        try:
+            for src, symbol, dst in edges:
+                from_id = state_ids.get(src)
+                if from_id is None:
+                    from_id = self.add_state(src)
+                to_id = state_ids.get(dst)
+                if to_id is None:
+                    to_id = self.add_state(dst)
+
+                if symbol == epsilon:
+                    targets = epsilon_transitions[from_id]
+                    if targets is None:
+                        epsilon_transitions[from_id] = [to_id]
+                    else:
+                        targets.append(to_id)
+                else:
+                    symbol_id = symbol_ids.get(symbol)
+                    if symbol_id is None:
+                        symbol_id = self.add_symbol(symbol)
+                    table = transitions[from_id]
+                    if table is None:
+                        transitions[from_id] = {symbol_id: [to_id]}
+                    else:
+                        targets = table.get(symbol_id)
+                        if targets is None:
+                            table[symbol_id] = [to_id]
+                        else:
+                            targets.append(to_id)
+                count += 1
+        finally:
+            self.num_edges += count
+
+    def set_start(self, name: str):
+        self.start = self.add_state(name)
+
+    def add_final(self, name: str):
+        self.finals.add(self.add_state(name))
+
+    @property
+    def num_states(self) -> int:
+        return len(self.state_names)
+
+    def edges(self) -> Iterator[Tuple[str, str, str]]:
+        """Yield every transition as (from, symbol, to) names; epsilon uses self.epsilon."""
+        names = self.state_names
+        for from_id in range(len(names)):
+            targets = self.epsilon_transitions[from_id]
+            if targets:
+                for to_id in targets:
+                    yield names[from_id], self.epsilon, names[to_id]
+            table = self.transitions[from_id]
+            if table:
+                for symbol_id, targets in table.items():
+                    for to_id in targets:
+                        yield names[from_id], self.symbols[symbol_id], names[to_id]
+
+    def get_epsilon_closure(self, states: Iterable[int]) -> Set[int]:
+        """Get all state ids reachable via epsilon transitions"""
+        closure = set(states)
+        stack = list(closure)
+
+        while stack:
+            targets = self.epsilon_transitions[stack.pop()]
+            if targets:
+                for next_state in targets:
+                    if next_state not in closure:
+                        closure.add(next_state)
+                        stack.append(next_state)
+
+        return closure
+
+    def simulate(self, symbols: Iterable[str]) -> bool:
+        """Simulate the NFA on a sequence of symbols (a str is a sequence of 1-char symbols)"""
+        if self.start is None:
+            return False
+        current_states = self.get_epsilon_closure((self.start,))
+
+        for symbol in symbols:
+            symbol_id = self.symbol_ids.get(symbol)
+            if symbol_id is None:
+                return False
+            next_states: Set[int] = set()
+            for state in current_states:
+                table = self.transitions[state]
+                if table:
+                    targets = table.get(symbol_id)
+                    if targets:
+                        next_states.update(targets)
+
+            current_states = self.get_epsilon_closure(next_states)
+            if not current_states:
+                return False
+
+        return not self.finals.isdisjoint(current_states)
+
+    def __repr__(self):
+        return (f"SparseNFA(states={self.num_states}, symbols={len(self.symbols)}, "
+                f"edges={self.num_edges}, finals={len(self.finals)})")
+
+
+@contextmanager
+def _collector_paused():
+    """
+    Pause the cyclic garbage collector while a loader runs. A load allocates
+    millions of lists and dicts that all stay alive, and each full collection
+    walks every one of them again: about a third of the load time on 1M edges.
+    The NFA holds no reference cycles, so there is nothing to collect.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _load_rows(rows: Iterable[List[str]], epsilon: str) -> SparseNFA:
+    """Feed split rows (transitions and % directives) into a new SparseNFA."""
+    nfa = SparseNFA(epsilon)
+    with _collector_paused():
+        nfa.add_transitions(_transition_rows(rows, nfa))
+    if nfa.start is None:
+        raise ValueError(f"Missing {_START_DIRECTIVE} directive")
+    return nfa
+
+
+def _transition_rows(rows: Iterable[List[str]], nfa: SparseNFA) -> Iterator[List[str]]:
+    """The transition rows, applying the % directives to nfa on the way."""
+    for line_no, row in enumerate(rows, start=1):
+        if len(row) == 3 and row[0][:1] != '%':
+            yield row
+        elif not row:
+            continue
+        elif row[0] == _START_DIRECTIVE:
+            if len(row) != 2:
+                raise ValueError(f"Line {line_no}: {_START_DIRECTIVE} takes exactly one state")
+            nfa.set_start(row[1])
+        elif row[0] == _FINAL_DIRECTIVE:
+            for name in row[1:]:
+                nfa.add_final(name)
+        elif row[0] == _STATES_DIRECTIVE:
+            for name in row[1:]:
+                nfa.add_state(name)
+        elif len(row) == 3:
+            yield row
+        else:
+            raise ValueError(f"Line {line_no}: expected [from] [symbol] [to], got {row!r}")
+
+
+def _split_lines(path: Path, separator: Optional[str]) -> Iterator[List[str]]:
+    """Rows of a file, blank and comment lines as [] so that rows keep their line numbers."""
+    with open(path, encoding='utf-8') as handle:
+        if separator is None:
+            for line in handle:
+                row = line.split()
+                yield row if row and row[0][0] != '#' else []
+        else:
+            for line in handle:
+                stripped = line.strip()
+                yield line.rstrip('\r\n').split(separator) if stripped and stripped[0] != '#' else []
+
+
+def load_edge_list(path, epsilon: str = 'e') -> SparseNFA:
+    """
+    Load a whitespace separated edge list, one transition per line in the same
+    order as the interactive prompt: [from] [symbol] [to].
+    Lines starting with '#' are comments, and the start/final states are given by
+    '%start q0' and '%final q5 q6' directive lines.
+    """
+    return _load_rows(_split_lines(Path(path), None), epsilon)
+
+
+def load_tsv(path, epsilon: str = 'e') -> SparseNFA:
+    """Same as load_edge_list but tab separated, so symbols and names may contain spaces."""
+    return _load_rows(_split_lines(Path(path), '\t'), epsilon)
+
+
+class _JsonReader:
+    """
+    Pull parser over a JSON file: the text is read in chunks and arrays are
+    decoded one element at a time, so a document never sits in memory whole.
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Append the next chunk to what is left of the buffer (False at end of file)."""
+        if self.eof:
+            return False
+        chunk = self.handle.read(_JSON_CHUNK)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it ('' at end of file)."""
+        while True:
+            buffer = self.buffer
+            pos = self.pos = _JSON_WHITESPACE.match(buffer, self.pos).end()
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON: expected {char!r}, got {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete value (meant for small ones: strings, numbers, short lists)."""
+        self.peek()
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number ending the buffer may go on in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self) -> Iterator:
+        """Decode the elements of an array one at a time."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        decode = _json_decoder.raw_decode
+        match_separator = _JSON_SEPARATOR.match
+        while True:
+            # Elements that sit whole in the buffer, with their separator, are
+            # decoded here directly; value() and peek() only handle the element
+            # that the end of the buffer cuts
+            buffer = self.buffer
+            pos = _JSON_WHITESPACE.match(buffer, self.pos).end()
+            while True:
+                try:
+                    value, end = decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break
+                found = match_separator(buffer, end)
+                if found is None:
+                    break
+                pos = self.pos = found.end()
+                yield value
+                if found.group(1) == ']':
+                    return
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"Invalid JSON: expected ',' or ']', got {separator or 'end of file'!r}")
+
+
+def load_json(path, epsilon: str = 'e') -> SparseNFA:
+    """
+    Load a JSON document of the form:
+        {"states": [...], "alphabet": [...], "start": "q0", "finals": [...],
+         "transitions": [["q0", "e", "q1"], ...]}
+    "states" and "alphabet" are optional and only fix the id order (when they
+    come before "transitions"); anything used by a transition is registered
+    automatically. The document is parsed incrementally, one array element at
+    a time, like the line based loaders.
+    """
+    nfa = SparseNFA(epsilon)
+    with open(path, encoding='utf-8') as handle, _collector_paused():
+        reader = _JsonReader(handle)
+        reader.expect('{')
+        more = reader.peek() != '}'
+        while more:
+            key = reader.value()
+            reader.expect(':')
+            if key == 'transitions':
+                nfa.add_transitions(reader.items())
+            elif key == 'states':
+                for name in reader.items():
+                    nfa.add_state(name)
+            elif key == 'alphabet':
+                for symbol in reader.items():
+                    if symbol != epsilon:
+                        nfa.add_symbol(symbol)
+            elif key == 'finals':
+                for name in reader.items():
+                    nfa.add_final(name)
+            elif key == 'start':
+                nfa.set_start(reader.value())
+            else:
+                reader.value()  # unknown keys are ignored
+            more = reader.peek() == ','
+            if more:
+                reader.pos += 1
+        reader.expect('}')
+
+    if nfa.start is None:
+        raise ValueError('Missing "start" state')
+    return nfa
+
+
+def load(path, epsilon: str = 'e') -> SparseNFA:
+    """Pick a loader from the file extension (.json, .tsv, anything else is an edge list)."""
+    suffix = Path(path).suffix.lower()
+    if suffix == '.json':
+        return load_json(path, epsilon)
+    if suffix == '.tsv':
+        return load_tsv(path, epsilon)
+    return load_edge_list(path, epsilon)
@@ -0,0 +1,131 @@
+"""
+NFA simulation over integer state ids with preallocated buffers.
+
+NFA.simulate builds a new set per character, plus a new closure set and
+stack per ε-closure. NFASimulator numbers the states once and then works in
+three preallocated lists: the current and next state lists (swapped after
+each character) and the closure stack. Set membership is a generation
+stamp: marks[state] == generation means the state is already in the next
+list, and moving to the next character is one increment, with no clearing.
+
+Only states with character transitions are stored in the state lists;
+ε-only states are walked through while computing the closure, and reaching
+the accept state just sets a flag. This keeps each step proportional to the
+states that can actually read the character.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from nfa import NFA
+from budgets import MatchStepsExceeded
+
+
+class NFASimulator:
+    """
+    Thompson NFA compiled to integer ids: transitions[i] maps a character to a
+    tuple of target ids (None for ε-only states), epsilons[i] lists ε targets.
+    Scratch buffers are pooled, so one simulator can be shared between threads.
+    """
+
+    def __init__(self, nfa: NFA):
+        states, ids = nfa.number_states()
+
+        self.num_states = len(states)
+        self.transitions: List[Optional[Dict[str, Tuple[int, ...]]]] = [
+            {ch: tuple(ids[d] for d in dests) for ch, dests in state.transitions.items()} or None
+            for state in states]
+        self.epsilons: List[Tuple[int, ...]] = [tuple(ids[d] for d in state.epsilon_transitions)
+                                                for state in states]
+        self.accepting: List[bool] = [state.is_accept for state in states]
+        self.start = 0
+        # Free (marks, generation, current, next, stack) buffers
+        self._scratch: List[list] = []
+
+    def _acquire(self) -> list:
+        try:
+            return self._scratch.pop()
+        except IndexError:
+            n = self.num_states
+            return [[0] * n, 0, [0] * n, [0] * n, [0] * n]
+
+    def simulate(self, input_string: str, max_steps: Optional[int] = None) -> bool:
+        """
+        Full match, same result as NFA.simulate. A step is one live state
+        reading one character; past max_steps, raises MatchStepsExceeded.
+        """
+        scratch = self._acquire()
+        marks, generation, current, following, stack = scratch
+        transitions = self.transitions
+        epsilons = self.epsilons
+        accepting = self.accepting
+
+        # ε-closure of the start state into current
+        generation += 1
+        marks[self.start] = generation
+        stack[0] = self.start
+        top = 1
+        size = 0
+        accepted = False
+        steps = 0
+        while top:
+            top -= 1
+            state = stack[top]
+            if transitions[state] is not None:
+                current[size] = state
+                size += 1
+            if accepting[state]:
+                accepted = True
+            for nxt in epsilons[state]:
+                if marks[nxt] != generation:
+                    marks[nxt] = generation
+                    stack[top] = nxt
+                    top += 1
+
+        for ch in input_string:
+            if not size:
+                accepted = False
+                break
+            steps += size
+            if max_steps is not None and steps > max_steps:
+                break
+            generation += 1
+            next_size = 0
+            accepted = False
+            for k in range(size):
+                targets = transitions[current[k]].get(ch)
+                if targets is None:
+                    continue
+                for target in targets:
+                    if marks[target] == generation:
+                        continue
+                    # ε-closure of target, appended to following
+                    marks[target] = generation
+                    stack[0] = target
+                    top = 1
+                    while top:
+                        top -= 1
+                        state = stack[top]
+                        if transitions[state] is not None:
+                            following[next_size] = state
+                            next_size += 1
+                        if accepting[state]:
+                            accepted = True
+                        for nxt in epsilons[state]:
+                            if marks[nxt] != generation:
+                                marks[nxt] = generation
+                                stack[top] = nxt
+                                top += 1
+            current, following = following, current
+            size = next_size
+            if not size and not accepted:
+                break
+
+        scratch[1] = generation
+        scratch[2] = current
+        scratch[3] = following
+        self._scratch.append(scratch)
+        if max_steps is not None and steps > max_steps:
+            raise MatchStepsExceeded(max_steps, steps)
+        return accepted
+
+    def __repr__(self):
+        return f"NFASimulator(states={self.num_states})"
@@ -0,0 +1,188 @@
+"""
+Parallel corpus matching: the compiled DFA tables are written once into a
+multiprocessing.shared_memory block, worker processes attach to it by name and
+read the tables in place, and the corpus is split into byte-range shards on
+line boundaries so every core scans its own part of the files.
+
+    for m in match_corpus(["(a|b)*c", "x+"], ["logs/1.txt", "logs/2.txt"]):
+        print(m.path, m.offset, m.pattern, m.line)
+"""
+import atexit
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from dfa import DFA
+from pattern_cache import CompiledPattern, compile_pattern
+
+DEFAULT_SHARD_SIZE = 8 << 20  # bytes per shard
+
+
+class TableLayout(NamedTuple):
+    """Where one DFA lives inside the shared block (offsets in int32 items)."""
+    alphabet: List[str]
+    start: int
+    num_states: int
+    table_offset: int
+    accepting_offset: int
+
+
+class SharedDFAHandle(NamedTuple):
+    """Picklable description of a SharedDFA, sent to workers instead of the tables."""
+    name: str
+    layouts: List[TableLayout]
+
+
+class SharedDFA:
+    """
+    One or more DFAs packed into a single shared memory block of int32:
+    [table of DFA 0][accepting of DFA 0][table of DFA 1]...
+    The creator owns the block and must close() it (or use it as a context manager).
+    """
+
+    def __init__(self, dfas: Sequence[DFA]):
+        layouts = []
+        offset = 0
+        for dfa in dfas:
+            layouts.append(TableLayout(list(dfa.alphabet), dfa.start, dfa.num_states,
+                                       offset, offset + len(dfa.table)))
+            offset += len(dfa.table) + dfa.num_states
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(4 * offset, 4))
+        view = self.shm.buf.cast('i')
+        try:
+            for dfa, layout in zip(dfas, layouts):
+                view[layout.table_offset:layout.accepting_offset] = array('i', dfa.table)
+                end = layout.accepting_offset + dfa.num_states
+                view[layout.accepting_offset:end] = array('i', map(int, dfa.accepting))
+        finally:
+            view.release()
+        self.handle = SharedDFAHandle(self.shm.name, layouts)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(handle: SharedDFAHandle) -> Tuple[shared_memory.SharedMemory, List[DFA]]:
+    """
+    Attach to a SharedDFA from another process. The returned DFAs index memoryview
+    slices of the shared block directly, nothing is copied.
+    """
+    # Pool workers share the creator's resource tracker, so attaching does not
+    # take ownership: the block is only unlinked by SharedDFA.close()
+    shm = shared_memory.SharedMemory(handle.name)
+    view = shm.buf.cast('i')
+    dfas = []
+    for layout in handle.layouts:
+        table = view[layout.table_offset:layout.accepting_offset]
+        accepting = view[layout.accepting_offset:layout.accepting_offset + layout.num_states]
+        dfas.append(DFA(layout.alphabet, table, accepting, layout.start))
+    return shm, dfas
+
+
+def detach(shm: shared_memory.SharedMemory, dfas: List[DFA]):
+    """Release the memoryview slices held by attached DFAs, then close the block."""
+    for dfa in dfas:
+        dfa.table.release()
+        dfa.accepting.release()
+    shm.close()
+
+
+class Shard(NamedTuple):
+    """Lines of `path` that start in the byte range [start, end)."""
+    path: str
+    start: int
+    end: int
+
+
+class Match(NamedTuple):
+    path: str
+    offset: int   # byte offset of the line in its file
+    pattern: int  # index of the matching pattern
+    line: str
+
+
+def iter_shards(paths: Sequence[str], shard_size: int = DEFAULT_SHARD_SIZE) -> Iterator[Shard]:
+    """
+    Split files into fixed byte ranges. The parent never reads the files: a worker
+    owns every line that starts inside its range, so ranges may cut lines anywhere.
+    """
+    for path in paths:
+        size = os.path.getsize(path)
+        for start in range(0, size, shard_size):
+            yield Shard(str(path), start, min(start + shard_size, size))
+
+
+def iter_lines(shard: Shard) -> Iterator[Tuple[int, bytes]]:
+    """Yield (offset, raw line) for every line starting inside the shard."""
+    with open(shard.path, 'rb') as handle:
+        pos = shard.start
+        if pos > 0:
+            # Skip the tail of the line owned by the previous shard (just its '\n'
+            # if the shard starts exactly on a line boundary)
+            handle.seek(pos - 1)
+            pos += len(handle.readline()) - 1
+        while pos < shard.end:
+            line = handle.readline()
+            if not line:
+                break
+            yield pos, line
+            pos += len(line)
+
+
+# Per-worker state, set by the pool initializer
+_worker_dfas: List[DFA] = []
+
+
+def _init_worker(handle: SharedDFAHandle):
+    global _worker_dfas
+    shm, _worker_dfas = attach(handle)
+    atexit.register(detach, shm, _worker_dfas)
+
+
+def _match_shard(shard: Shard) -> List[Match]:
+    matches = []
+    dfas = _worker_dfas
+    for offset, raw in iter_lines(shard):
+        line = raw.rstrip(b'\r\n').decode('utf-8', errors='replace')
+        for index, dfa in enumerate(dfas):
+            if dfa.simulate(line):
+                matches.append(Match(shard.path, offset, index, line))
+    return matches
+
+
+def match_corpus(patterns: Sequence[Union[str, CompiledPattern, DFA]], paths: Sequence[str],
+                 workers: Optional[int] = None, ordered: bool = True,
+                 shard_size: int = DEFAULT_SHARD_SIZE) -> Iterator[Match]:
+    """
+    Match every line of every file against every pattern (full match) on a process pool.
+    With ordered=True matches come back in file/offset order, otherwise as soon as
+    each shard is done. The shared block is released once the iterator is exhausted
+    or closed.
+    """
+    dfas = []
+    for pattern in patterns:
+        if isinstance(pattern, str):
+            pattern = compile_pattern(pattern)
+        dfas.append(pattern.require_dfa() if isinstance(pattern, CompiledPattern) else pattern)
+
+    with SharedDFA(dfas) as shared:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(shared.handle,)) as pool:
+            shards = iter_shards(paths, shard_size)
+            if ordered:
+                results = pool.map(_match_shard, shards)
+            else:
+                results = (future.result() for future in
+                           as_completed([pool.submit(_match_shard, shard) for shard in shards]))
+            for shard_matches in results:
+                yield from shard_matches
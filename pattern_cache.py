@@ -0,0 +1,183 @@
+"""
+Compiled patterns and the LRU cache in front of compile_regex.
+
+Every user of the engine imports this module, so the NFA simulator and the
+literal trie, which only some patterns need, are imported where they are
+first needed rather than here.
+"""
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Optional
+
+from lexer import Lexer
+from regex_parser import Parser
+from nfa_builder import NFABuilder
+from nfa import NFA
+from dfa import DFA
+from pike_vm import PikeVM, Span
+from budgets import (UNLIMITED, Budget, MatchStepsExceeded, NestingTooDeep, PatternTooLong,
+                     TooManyASTNodes, TooManyDFAStates, TooManyNFAStates, check, count_ast_nodes,
+                     count_nfa_states, nesting_depth)
+
+if TYPE_CHECKING:
+    from literal_trie import LiteralTrie
+    from nfa_sim import NFASimulator
+
+
+class CompiledPattern:
+    """
+    A regex compiled once to its Thompson NFA and the determinized DFA used for matching.
+    dfa is None when determinizing went over the DFA state budget: matching then
+    simulates the NFA instead.
+    A plain word list is given as its trie (`literals`) and nfa=None: the NFA is
+    only built from the trie the first time something asks for it.
+    """
+
+    def __init__(self, pattern: str, nfa: Optional[NFA], dfa: Optional[DFA], num_groups: int = 0,
+                 budget: Budget = UNLIMITED, literals: Optional["LiteralTrie"] = None):
+        self.pattern = pattern
+        self._nfa = nfa
+        self._literals = literals
+        self.dfa = dfa
+        self.num_groups = num_groups
+        self.budget = budget
+        self._pike_vm: Optional[PikeVM] = None
+        self._simulator: Optional["NFASimulator"] = None
+
+    @property
+    def nfa(self) -> NFA:
+        if self._nfa is None:
+            self._nfa = self._literals.to_nfa()
+        return self._nfa
+
+    def match(self, text: str) -> bool:
+        """True if the whole text is accepted; raises MatchStepsExceeded past the step budget"""
+        max_steps = self.budget.max_match_steps
+        if self.dfa is not None:
+            # The DFA takes exactly one step per character
+            check(max_steps, len(text), MatchStepsExceeded)
+            return self.dfa.simulate(text)
+        if self._simulator is None:
+            from nfa_sim import NFASimulator
+            self._simulator = NFASimulator(self.nfa)
+        return self._simulator.simulate(text, max_steps)
+
+    def captures(self, text: str) -> Optional[List[Span]]:
+        """
+        Full match with group spans (see PikeVM.match); the VM is built on first
+        use. Raises MatchStepsExceeded past the step budget.
+        """
+        if self._pike_vm is None:
+            self._pike_vm = PikeVM(self.nfa, self.num_groups)
+        return self._pike_vm.match(text, self.budget.max_match_steps)
+
+    def require_dfa(self) -> DFA:
+        """
+        The DFA, for callers that only work on tables (product, enumeration,
+        process pools); raises TooManyDFAStates if it went over the budget.
+        """
+        if self.dfa is None:
+            limit = self.budget.max_dfa_states
+            raise TooManyDFAStates(limit, limit + 1)
+        return self.dfa
+
+    def __repr__(self):
+        return f"CompiledPattern({self.pattern!r}, {self.dfa if self.dfa is not None else 'NFA fallback'})"
+
+
+def compile_regex(pattern: str, budget: Budget = UNLIMITED) -> CompiledPattern:
+    """
+    Lexer -> Parser -> NFABuilder -> subset construction, without any caching.
+    Each stage is checked against the budget and raises its BudgetExceeded
+    subclass, except the DFA: over max_dfa_states the pattern keeps its NFA only. Plain word lists take a shortcut through a trie under
+    the same checks.
+
+    The NFA keeps the left-first priority of alternatives only when the pattern
+    has groups: captures() is a full match, so without groups the only span is
+    the whole text whichever alternative wins, and every alternation of plain
+    words can be a trie.
+    """
+    from literal_trie import compile_literals, literal_alternatives
+    check(budget.max_pattern_length, len(pattern), PatternTooLong)
+    if budget.max_nesting_depth is not None:
+        # Before parsing: the parser would hit the recursion limit first
+        check(budget.max_nesting_depth, nesting_depth(pattern), NestingTooDeep)
+    words = literal_alternatives(pattern)
+    if words is not None:
+        # Plain word lists skip the parser and go straight to a trie / minimal DFA.
+        # The AST they would parse to: each word of n characters is n chars and
+        # n - 1 concatenations, joined by len(words) - 1 alternations
+        check(budget.max_ast_nodes, 2 * sum(len(word) for word in words) - 1, TooManyASTNodes)
+        trie = compile_literals(words)
+        check(budget.max_nfa_states, trie.num_nodes + 1, TooManyNFAStates)
+        dfa = trie.to_dfa()
+        if budget.max_dfa_states is not None and dfa.num_states > budget.max_dfa_states:
+            dfa = None
+        return CompiledPattern(pattern, None, dfa, budget=budget, literals=trie)
+    parser = Parser(Lexer(pattern))
+    ast = parser.parse()
+    if budget.max_ast_nodes is not None:
+        check(budget.max_ast_nodes, count_ast_nodes(ast), TooManyASTNodes)
+    nfa = NFABuilder.build_from_ast(ast, ordered=parser.group_count > 0)
+    if budget.max_nfa_states is not None:
+        check(budget.max_nfa_states, count_nfa_states(nfa), TooManyNFAStates)
+    try:
+        dfa = DFA.from_nfa(nfa, budget.max_dfa_states)
+    except TooManyDFAStates:
+        dfa = None
+    return CompiledPattern(pattern, nfa, dfa, parser.group_count, budget)
+
+
+class PatternCache:
+    """
+    Thread-safe LRU cache of compiled patterns, all compiled under one budget.
+    Compilation happens outside the lock, so a slow pattern never blocks lookups
+    of other patterns (two threads may race to compile the same one, the first wins).
+    """
+
+    def __init__(self, max_size: int = 256, budget: Budget = UNLIMITED):
+        self.max_size = max_size
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CompiledPattern]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pattern: str) -> CompiledPattern:
+        with self._lock:
+            compiled = self._entries.get(pattern)
+            if compiled is not None:
+                self._entries.move_to_end(pattern)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        compiled = compile_regex(pattern, self.budget)
+
+        with self._lock:
+            existing = self._entries.get(pattern)
+            if existing is not None:
+                return existing
+            self._entries[pattern] = compiled
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, pattern: str):
+        return pattern in self._entries
+
+
+# Process-wide cache shared by every caller of compile_pattern
+default_cache = PatternCache()
+
+
+def compile_pattern(pattern: str, cache: Optional[PatternCache] = None) -> CompiledPattern:
+    """Compile through the shared cache (or the given one)."""
+    return (cache if cache is not None else default_cache).get(pattern)
@@ -0,0 +1,138 @@
+from typing import Dict, List, Optional, Tuple
+
+from lexer import Lexer
+from regex_parser import Parser
+from nfa_builder import NFABuilder
+from nfa import NFA
+from budgets import MatchStepsExceeded
+
+Span = Optional[Tuple[int, int]]
+
+
+class PikeVM:
+    """
+    Submatch extraction in one pass over the input (Pike's VM).
+
+    The Thompson NFA is simulated like NFA.simulate, but every thread carries its
+    own capture slots, written when the thread passes a group's save state.
+    Threads are kept in priority order (left alternative first, loops greedy, as
+    given by the order of epsilon transitions) and each NFA state holds at most
+    one thread per step, so a match costs O(len(text) * states) whatever the input.
+    """
+
+    def __init__(self, nfa: NFA, num_groups: int = 0):
+        self.num_groups = num_groups
+        self.num_slots = 2 * (num_groups + 1)
+
+        # Number the states reachable from the start so threads are plain ints
+        states, ids = nfa.number_states()
+
+        self.transitions: List[Dict[str, List[int]]] = [
+            {ch: [ids[d] for d in dests] for ch, dests in state.transitions.items()}
+            for state in states]
+        self.epsilons: List[List[int]] = [[ids[d] for d in state.epsilon_transitions]
+                                          for state in states]
+        self.saves: List[Optional[int]] = [state.save for state in states]
+        self.accepting: List[bool] = [state.is_accept for state in states]
+
+    @classmethod
+    def compile(cls, pattern: str) -> "PikeVM":
+        parser = Parser(Lexer(pattern))
+        ast = parser.parse()
+        return cls(NFABuilder.build_from_ast(ast), parser.group_count)
+
+    def _add_thread(self, threads: List[Tuple[int, tuple]], marks: List[int], generation: int,
+                    state: int, caps: tuple, pos: int):
+        """Follow epsilon transitions from state in priority order, applying saves."""
+        epsilons = self.epsilons
+        saves = self.saves
+        stack = [(state, caps)]
+        while stack:
+            state, caps = stack.pop()
+            if marks[state] == generation:
+                continue
+            marks[state] = generation
+            slot = saves[state]
+            if slot is not None:
+                caps = caps[:slot] + (pos,) + caps[slot + 1:]
+            threads.append((state, caps))
+            # Reversed so the first epsilon transition is explored first
+            for nxt in reversed(epsilons[state]):
+                if marks[nxt] != generation:
+                    stack.append((nxt, caps))
+
+    def _run(self, text: str, anchored: bool, max_steps: Optional[int] = None) -> Optional[tuple]:
+        n = len(text)
+        marks = [-1] * len(self.accepting)
+        generation = 0
+        empty = (None,) * self.num_slots
+        transitions = self.transitions
+        accepting = self.accepting
+
+        threads: List[Tuple[int, tuple]] = []
+        matched = None
+        steps = 0
+        for pos in range(n + 1):
+            # A new attempt starts at every position for search, lowest priority
+            if matched is None and (pos == 0 or not anchored):
+                self._add_thread(threads, marks, generation, 0, (pos,) + empty[1:], pos)
+            if not threads:
+                break
+
+            generation += 1
+            next_threads: List[Tuple[int, tuple]] = []
+            ch = text[pos] if pos < n else None
+            if ch is not None:
+                steps += len(threads)
+                if max_steps is not None and steps > max_steps:
+                    raise MatchStepsExceeded(max_steps, steps)
+            for state, caps in threads:
+                if accepting[state] and (pos == n or not anchored):
+                    # Highest priority match so far: lower priority threads are cut
+                    matched = caps[:1] + (pos,) + caps[2:]
+                    break
+                if ch is not None:
+                    dests = transitions[state].get(ch)
+                    if dests:
+                        for nxt in dests:
+                            self._add_thread(next_threads, marks, generation, nxt, caps, pos + 1)
+            threads = next_threads
+
+        return matched
+
+    def _spans(self, caps: Optional[tuple]) -> Optional[List[Span]]:
+        if caps is None:
+            return None
+        return [(caps[2 * i], caps[2 * i + 1])
+                if caps[2 * i] is not None and caps[2 * i + 1] is not None else None
+                for i in range(self.num_groups + 1)]
+
+    def match(self, text: str, max_steps: Optional[int] = None) -> Optional[List[Span]]:
+        """
+        Full match. Returns the (start, end) span of group 0 (the whole match) and
+        of groups 1..n (None if a group took no part), or None if text is rejected.
+        A step is one thread reading one character; past max_steps, raises
+        MatchStepsExceeded.
+        """
+        return self._spans(self._run(text, anchored=True, max_steps=max_steps))
+
+    def search(self, text: str, max_steps: Optional[int] = None) -> Optional[List[Span]]:
+        """Leftmost match anywhere in text, same spans and step limit as match()."""
+        return self._spans(self._run(text, anchored=False, max_steps=max_steps))
+
+    def groups(self, text: str) -> Optional[List[Optional[str]]]:
+        """Full match returning the text of groups 1..n instead of spans."""
+        spans = self.match(text)
+        if spans is None:
+            return None
+        return [text[span[0]:span[1]] if span else None for span in spans[1:]]
+
+
+def test_pike_vm():
+    print("\nTesting Pike VM captures...")
+    for pattern, text in [("(a+)(b|c)", "aaac"), ("((a|b)*)c", "abac"), ("(a)?b", "b")]:
+        vm = PikeVM.compile(pattern)
+        print(f"  {pattern!r} on {text!r} -> {vm.match(text)} {vm.groups(text)}")
+    # Left alternative first, like Python's re: (0,4) (0,1) (1,4), not a longest first prefix
+    vm = PikeVM.compile("(a|ab)(c|bcd)")
+    print(f"  search '(a|ab)(c|bcd)' in 'abcd' -> {vm.search('abcd')}")
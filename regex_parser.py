@@ -1,14 +1,19 @@
 from lexer import Lexer
-from ast_nodes import ASTNode, CharNode, DigitNode, StarNode, OptionalNode, PlusNode, ConcatNode, OrNode
+from ast_nodes import ASTNode, CharNode, DigitNode, StarNode, OptionalNode, PlusNode, ConcatNode, OrNode, GroupNode
 from token_type import TokenType
 
 # Tokens that can START a new expression or sub-expression (Literal or Group)
-_PRIMARY_STARTERS = [TokenType.CHAR, TokenType.DIGIT, TokenType.EPSILON, TokenType.LPAREN]
+_PRIMARY_STARTERS = frozenset([TokenType.CHAR, TokenType.DIGIT, TokenType.EPSILON, TokenType.LPAREN])
+
+# Postfix operator tokens and the node each one wraps its operand in
+_POSTFIX = {TokenType.STAR: StarNode, TokenType.PLUS: PlusNode, TokenType.OPTIONAL: OptionalNode}
 
 class Parser:
     def __init__(self, lexer: Lexer):
         self.lexer = lexer
         self.current_token = self.lexer.get_next_token()
+        # Capture groups are numbered 1..n by the position of their '('
+        self.group_count = 0
     
     
     def eat(self, token_type: TokenType):
@@ -23,24 +28,28 @@ class Parser:
         """
         Handles the smallest unit: a single literal or a parenthesized expression.
         Production: factor -> CHAR | DIGIT | EPSILON | ( expr )
+        Every parenthesized expression is a capture group.
         """
         token = self.current_token
+        kind = token.type
+        
+        if kind == TokenType.CHAR: 
+            self.eat(TokenType.CHAR)
+            return CharNode(token.value)
         
-        if token.type == TokenType.LPAREN:
+        elif kind == TokenType.LPAREN:
             self.eat(TokenType.LPAREN)
+            self.group_count += 1
+            index = self.group_count
             node = self.expr()
             self.eat(TokenType.RPAREN)
-            return node
-        
-        elif token.type == TokenType.CHAR: 
-            self.eat(TokenType.CHAR)
-            return CharNode(token.value)
+            return GroupNode(node, index)
         
-        elif token.type == TokenType.DIGIT:
+        elif kind == TokenType.DIGIT:
             self.eat(TokenType.DIGIT)
             return DigitNode(token.value)
         
-        elif token.type == TokenType.EPSILON:
+        elif kind == TokenType.EPSILON:
             self.eat(TokenType.EPSILON)
             return CharNode('ε')
         
@@ -55,16 +64,11 @@ class Parser:
         """
         node = self.factor()
         
-        while self.current_token.type in [TokenType.STAR, TokenType.PLUS, TokenType.OPTIONAL]:
-            if self.current_token.type == TokenType.STAR:
-                self.eat(TokenType.STAR)
-                node = StarNode(node)
-            elif self.current_token.type == TokenType.PLUS:
-                self.eat(TokenType.PLUS)
-                node = PlusNode(node)
-            elif self.current_token.type == TokenType.OPTIONAL: 
-                self.eat(TokenType.OPTIONAL)
-                node = OptionalNode(node)
+        postfix = _POSTFIX.get(self.current_token.type)
+        while postfix is not None:
+            self.eat(self.current_token.type)
+            node = postfix(node)
+            postfix = _POSTFIX.get(self.current_token.type)
         
         return node
     
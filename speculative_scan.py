@@ -0,0 +1,217 @@
+"""
+Parallel DFA run over one huge input. A DFA pass is sequential, but the effect
+of a chunk of input is just a function state -> state. Each worker computes
+that function for its chunk from every possible entry state at once (runs from
+different entry states usually merge after a few characters, after which only
+one run is left), the functions are composed in order to find the real entry
+state of every chunk, and an optional second parallel pass collects the match
+positions from those exact entry states.
+
+    result = speculative_scan("(a|b)*c", "huge.log")
+    result.accepted, result.final_state, result.positions[:10]
+"""
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from dfa import DEAD, DFA
+from parallel_match import SharedDFA, SharedDFAHandle, attach, detach
+from pattern_cache import CompiledPattern, compile_pattern
+
+DEFAULT_CHUNK_SIZE = 8 << 20  # bytes per chunk
+
+
+class ScanResult(NamedTuple):
+    final_state: int        # DFA state after the whole input (DEAD if it died)
+    accepted: bool          # whole input matched
+    positions: List[int]    # byte offsets where the input read so far is accepted
+
+
+def reachable_states(dfa: DFA) -> Set[int]:
+    """States reachable from the start state (the only possible chunk entry states)."""
+    k = dfa.num_symbols
+    seen = {dfa.start}
+    stack = [dfa.start]
+    while stack:
+        state = stack.pop()
+        for nxt in dfa.table[state * k:(state + 1) * k]:
+            if nxt != DEAD and nxt not in seen:
+                seen.add(nxt)
+                stack.append(nxt)
+    return seen
+
+
+def run_from(dfa: DFA, text: str, pos: int, state: int) -> int:
+    """Plain DFA run over text[pos:] from the given state."""
+    table = dfa.table
+    symbol_index = dfa.symbol_index
+    k = dfa.num_symbols
+    for i in range(pos, len(text)):
+        if state == DEAD:
+            break
+        symbol = symbol_index.get(text[i])
+        state = DEAD if symbol is None else table[state * k + symbol]
+    return state
+
+
+def chunk_mapping(dfa: DFA, text: str, entries: Iterable[int]) -> Dict[int, int]:
+    """
+    entry state -> exit state for one chunk, simulating all entries in lockstep.
+    Entries that reach the same state are merged, so the cost drops to a single
+    run as soon as they all converge.
+    """
+    table = dfa.table
+    symbol_index = dfa.symbol_index
+    k = dfa.num_symbols
+
+    # current state -> entry states that lead to it
+    groups: Dict[int, List[int]] = {state: [state] for state in entries}
+    pos = 0
+    n = len(text)
+    while pos < n and len(groups) > 1:
+        symbol = symbol_index.get(text[pos])
+        pos += 1
+        moved: Dict[int, List[int]] = {}
+        for state, origins in groups.items():
+            nxt = DEAD if symbol is None or state == DEAD else table[state * k + symbol]
+            bucket = moved.get(nxt)
+            if bucket is None:
+                moved[nxt] = origins
+            else:
+                bucket.extend(origins)
+        groups = moved
+
+    if pos < n and groups:
+        (state, origins), = groups.items()
+        groups = {run_from(dfa, text, pos, state): origins}
+
+    return {origin: state for state, origins in groups.items() for origin in origins}
+
+
+def _utf8_length(ch: str) -> int:
+    code = ord(ch)
+    if code < 0x80 or 0xDC80 <= code <= 0xDCFF:  # ASCII or an undecodable byte
+        return 1
+    if code < 0x800:
+        return 2
+    if code < 0x10000:
+        return 3
+    return 4
+
+
+def accept_positions(dfa: DFA, text: str, base: int, state: int) -> List[int]:
+    """Byte offsets (base + bytes consumed) after which the run from `state` is accepting."""
+    table = dfa.table
+    symbol_index = dfa.symbol_index
+    accepting = dfa.accepting
+    k = dfa.num_symbols
+    ascii_only = text.isascii()
+
+    positions = []
+    offset = base
+    for ch in text:
+        symbol = symbol_index.get(ch)
+        if symbol is None:
+            break
+        state = table[state * k + symbol]
+        if state == DEAD:
+            break
+        offset += 1 if ascii_only else _utf8_length(ch)
+        if accepting[state]:
+            positions.append(offset)
+    return positions
+
+
+def split_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Tuple[int, int]]:
+    """Byte ranges of about chunk_size, moved forward so no UTF-8 sequence is cut."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as handle:
+        for cut in range(chunk_size, size, chunk_size):
+            handle.seek(cut)
+            head = handle.read(4)
+            skip = 0
+            while skip < len(head) and 0x80 <= head[skip] <= 0xBF:
+                skip += 1
+            if cut + skip > bounds[-1] and cut + skip < size:
+                bounds.append(cut + skip)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _read_text(path: str, start: int, end: int) -> str:
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        # surrogateescape keeps one character per undecodable byte, so offsets stay exact
+        return handle.read(end - start).decode('utf-8', errors='surrogateescape')
+
+
+# Per-worker DFA attached to the shared block, set by the pool initializer
+_worker_dfa: Optional[DFA] = None
+
+
+def _init_worker(handle: SharedDFAHandle):
+    global _worker_dfa
+    shm, dfas = attach(handle)
+    atexit.register(detach, shm, dfas)
+    _worker_dfa = dfas[0]
+
+
+def _mapping_job(path: str, start: int, end: int, entries: List[int]) -> Dict[int, int]:
+    return chunk_mapping(_worker_dfa, _read_text(path, start, end), entries)
+
+
+def _positions_job(path: str, start: int, end: int, state: int) -> List[int]:
+    return accept_positions(_worker_dfa, _read_text(path, start, end), start, state)
+
+
+def speculative_scan(pattern: Union[str, CompiledPattern, DFA], path: str,
+                     workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     reachable_only: bool = True, positions: bool = True) -> ScanResult:
+    """
+    Run the pattern's DFA over the whole file using every core.
+    reachable_only: chunks after the first start from the states reachable from
+    the DFA start instead of every state (same result, less work).
+    positions: also collect every byte offset where the prefix read so far matches
+    (a second parallel pass); without it only the final state is computed.
+    """
+    if isinstance(pattern, str):
+        pattern = compile_pattern(pattern)
+    dfa = pattern.require_dfa() if isinstance(pattern, CompiledPattern) else pattern
+
+    chunks = split_chunks(path, chunk_size)
+    if reachable_only:
+        entries = sorted(reachable_states(dfa))
+    else:
+        entries = list(range(dfa.num_states))
+
+    with SharedDFA([dfa]) as shared:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(shared.handle,)) as pool:
+            # Pass 1: the state -> state function of every chunk, in parallel
+            futures = [pool.submit(_mapping_job, path, start, end,
+                                   [dfa.start] if i == 0 else entries)
+                       for i, (start, end) in enumerate(chunks)]
+
+            # Compose the functions in order to get each chunk's real entry state
+            chunk_entries = []
+            state = dfa.start
+            for future in futures:
+                chunk_entries.append(state)
+                mapping = future.result()
+                state = DEAD if state == DEAD else mapping[state]
+            final_state = state
+
+            found: List[int] = []
+            if positions:
+                if dfa.accepting[dfa.start]:
+                    found.append(0)
+                # Pass 2: re-run each live chunk from its exact entry state
+                jobs = [pool.submit(_positions_job, path, start, end, entry)
+                        for (start, end), entry in zip(chunks, chunk_entries) if entry != DEAD]
+                for job in jobs:
+                    found.extend(job.result())
+
+    accepted = final_state != DEAD and bool(dfa.accepting[final_state])
+    return ScanResult(final_state, accepted, found)
@@ -1,6 +1,4 @@
-import re 
-from enum import Enum 
-from typing import List, Optional, Set, Dict
+from typing import Optional, Set, Dict
 
 
 class State:
@@ -11,7 +9,11 @@ class State:
         State._id_counter += 1
         self.is_accept = is_accept
         self.transitions: Dict[str, Set["State"]] = {}  # char -> set of states
-        self.epsilon_transitions: Set["State"] = set()
+        # A dict used as an ordered set: O(1) membership, and iteration keeps
+        # insertion order, earlier epsilon transitions have priority (see PikeVM)
+        self.epsilon_transitions: Dict["State", None] = {}
+        # Capture slot recorded when a thread passes through this state (None: no capture)
+        self.save: Optional[int] = None
     
     def add_transition(self, char: str, state: "State"):
         if char not in self.transitions:
@@ -19,7 +21,7 @@ class State:
         self.transitions[char].add(state)
     
     def add_epsilon_transition(self, state: "State"):
-        self.epsilon_transitions.add(state)
+        self.epsilon_transitions[state] = None
     
     def __repr__(self):
         return f"State({self.id}, accept={self.is_accept})"
@@ -1,6 +1,4 @@
-import re 
-from enum import Enum 
-from typing import List, Optional, Set
+from typing import Optional
 from token_type import TokenType
 
 class Token:
@@ -0,0 +1,144 @@
+"""
+Table-driven tokenizers generated from a list of (token name, regex) rules.
+
+All rules are compiled into one NFA (a fresh start state with an ε edge to
+each rule's NFA) and determinized once. Every DFA state is tagged with the
+lowest index of the rules whose accept state it contains, so tokenizing is
+the usual maximal munch: run the DFA from the current position until it dies,
+remember the last accepting state seen, emit that rule's token and restart
+right after it. The longest match wins and, among matches of the same length,
+the rule listed first.
+
+The regex grammar has no whitespace or character classes; one_of() builds
+the alternation for a set of characters, and `skip` lists the characters
+dropped between tokens.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from nfa import NFA
+from state import State
+from dfa import DEAD, DFA, determinize
+from pattern_cache import compile_pattern
+
+# Characters the Lexer turns into operators, they cannot appear in one_of()
+_OPERATOR_CHARS = set('()*+?|')
+
+Token = Tuple[str, int, int]
+
+
+class TokenizeError(ValueError):
+    """No rule matches the input at `position`."""
+
+    def __init__(self, position: int, text: str):
+        super().__init__(f"No token rule matches at position {position}: {text[position:position + 20]!r}")
+        self.position = position
+
+
+def one_of(chars: Iterable[str]) -> str:
+    """Regex matching any single one of the characters, e.g. one_of('abc') == '(a|b|c)'"""
+    chars = sorted(set(chars))
+    bad = _OPERATOR_CHARS.intersection(chars) | {ch for ch in chars if ch.isspace()}
+    if bad:
+        raise ValueError(f"Characters not expressible in a pattern: {''.join(sorted(bad))!r}")
+    if not chars:
+        raise ValueError("one_of() needs at least one character")
+    return '(' + '|'.join(chars) + ')'
+
+
+class Tokenizer:
+    """
+    Maximal-munch tokenizer over one combined DFA.
+    rule_at[state] is the index of the rule a DFA state accepts for (-1: none).
+    Rules named None are matched but not yielded (comments, separators...).
+    """
+
+    def __init__(self, rules: Sequence[Tuple[Optional[str], str]], skip: str = ''):
+        if not rules:
+            raise ValueError("A tokenizer needs at least one rule")
+        self.names: List[Optional[str]] = [name for name, _ in rules]
+        self.patterns: List[str] = [pattern for _, pattern in rules]
+        self.skip = frozenset(skip)
+
+        start = State()
+        rule_of_accept: Dict[State, int] = {}
+        for index, pattern in enumerate(self.patterns):
+            compiled = compile_pattern(pattern)
+            if compiled.match(''):
+                raise ValueError(f"Token rule {self.names[index]!r} matches the empty string: {pattern!r}")
+            start.add_epsilon_transition(compiled.nfa.start)
+            # Identical patterns share a cached NFA, the first rule keeps it
+            rule_of_accept.setdefault(compiled.nfa.accept, index)
+
+        alphabet, table, subsets = determinize(NFA(start, None))
+        self.rule_at: List[int] = [
+            min((rule_of_accept[state] for state in subset if state in rule_of_accept), default=-1)
+            for subset in subsets
+        ]
+        self.dfa = DFA(alphabet, table, [rule >= 0 for rule in self.rule_at])
+
+    def tokenize(self, text: str) -> Iterator[Token]:
+        """
+        Yield (name, start, end) for every token, in order; raises TokenizeError
+        where no rule matches. Each token costs the characters the DFA reads
+        past its end before dying, so for usual token sets this is one pass.
+        """
+        table = self.dfa.table
+        symbol_index = self.dfa.symbol_index
+        num_symbols = self.dfa.num_symbols
+        start = self.dfa.start
+        rule_at = self.rule_at
+        names = self.names
+        skip = self.skip
+
+        pos = 0
+        length = len(text)
+        while pos < length:
+            if text[pos] in skip:
+                pos += 1
+                continue
+
+            state = start
+            last_rule = -1
+            last_end = pos
+            i = pos
+            while i < length:
+                symbol = symbol_index.get(text[i])
+                if symbol is None:
+                    break
+                state = table[state * num_symbols + symbol]
+                if state == DEAD:
+                    break
+                i += 1
+                if rule_at[state] >= 0:
+                    last_rule = rule_at[state]
+                    last_end = i
+
+            if last_rule < 0:
+                raise TokenizeError(pos, text)
+            if names[last_rule] is not None:
+                yield names[last_rule], pos, last_end
+            pos = last_end
+
+    def __repr__(self):
+        return f"Tokenizer(rules={len(self.names)}, {self.dfa})"
+
+
+def generate_tokenizer(rules: Sequence[Tuple[Optional[str], str]], skip: str = '') -> Tokenizer:
+    """Compile (token name, regex) rules into a Tokenizer; see Tokenizer."""
+    return Tokenizer(rules, skip)
+
+
+def test_tokenizer():
+    print("\nTesting generated tokenizer...")
+    letters = one_of('abcdefghijklmnopqrstuvwxyz')
+    digits = one_of('0123456789')
+    tokenizer = generate_tokenizer([
+        ('IF', 'if'),
+        ('NAME', f'{letters}({letters}|{digits})*'),
+        ('NUMBER', f'{digits}+'),
+        ('ASSIGN', '='),
+        ('EQUALS', '=='),
+    ], skip=' \t\n')
+    text = "if x1 == 42 iffy = 7"
+    for name, start, end in tokenizer.tokenize(text):
+        print(f"  {name:<7} {text[start:end]!r}")